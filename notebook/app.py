@@ -1,10 +1,17 @@
 import pandas as pd 
 import streamlit as st
-from china_japan import generate_forecast
+from china_japan import generate_forecast, result_cache
+from landed_price import breakdown_table, landed_price_table, route_matrix, break_even_table, BREAK_EVEN_INPUTS
+from timing import span, start_run, finish_run, current_run, stage_table
 
 # Set page config
 st.set_page_config(page_title="HRC Price Forecasting Model Dashboard", layout="wide")
 
+# Hidden timing panel, shown when the dashboard is opened with ?debug=1
+debug = st.query_params.get("debug") == "1"
+TIMING_HISTORY = 20
+timing_run = start_run(enabled=debug)
+
 # --- Custom Dashboard Title ---
 st.markdown("""
     <div style='text-align: center; padding: 1rem 0; background-color: #0080C7; color: white; border-radius: 8px;'>
@@ -40,9 +47,15 @@ selected_countries = st.sidebar.multiselect(
     default=["China", "Japan"]
 )
 
+# Optional Monte Carlo fan chart
+st.sidebar.markdown("**Simulation**")
+fan_chart = st.sidebar.checkbox("Show Monte Carlo fan chart (5/25/50/75/95%)", value=False)
+n_paths = st.sidebar.number_input("Number of simulated paths", min_value=1000, max_value=200000, value=5000, step=1000, disabled=not fan_chart)
+
 # --- Plot graph ---
-fig, CN_JP_forecast = generate_forecast(up_iron_ore, up_hcc, up_scrap, up_export, up_fai, down_iron_ore, down_hcc, down_scrap, down_export, down_fai, selected_countries)
-st.plotly_chart(fig, use_container_width=True)
+fig, CN_JP_forecast = generate_forecast(up_iron_ore, up_hcc, up_scrap, up_export, up_fai, down_iron_ore, down_hcc, down_scrap, down_export, down_fai, selected_countries, fan_chart, n_paths)
+with span("chart_render"):
+    st.plotly_chart(fig, use_container_width=True)
 
 # --- Export China's and Japan's forecasted HRC prices as csv ---
 CN_JP_forecast_csv = CN_JP_forecast.to_csv(index=True).encode("utf-8")
@@ -56,134 +69,135 @@ st.download_button(
 )
 st.markdown("<div style='margin-bottom: 1rem;'></div>", unsafe_allow_html=True)
 
-# Obtain list of forecasted dates
-date_options = CN_JP_forecast.index.tolist()
-
-# Dropdown for date selection
-selected_date = st.selectbox("📅 Select Month for Landed Price Calculation", date_options)
-
-# Obtain China's and Japan's forecasted HRC price
-CN_forecasted_value = CN_JP_forecast.loc[selected_date, 'China HRC Forecast (FOB, $/t)']
-JP_forecasted_value = CN_JP_forecast.loc[selected_date, 'Japan HRC Forecast (FOB, $/t)']
-
-col1, col2 = st.columns(2)
-# --- India Landed Price (China) Calculator ---
-with col1:
-    st.subheader("Landed Price of China's HRC in India")
-
-    # Editable fields
-    sea_freight = st.number_input("Sea Freight ($/t)", value=30, key=1)
-    basic_customs_duty = st.number_input("Basic Customs Duty (%)", value=7.5, key=2)
-    antidumping = st.number_input("Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)", value=0, key=3)
-    mip = st.number_input("MIP (5th Feb 2016 to 4th Aug 2016) ($/t)", value=0, key=4)
-    safeguard_duty = st.number_input("Safeguard Duty (%)", value=0, key=5)
-    applicable_SGD = st.number_input("Applicable SGD ($/t)", value=0, key=6)
-    LC_Port_charges = st.number_input("LC Charges & Port Charges ($/t)", value=10, key=7)
-    exchange_rate = st.number_input("Exchange Rate (INR/$)", value=86, key=8)
-    freight_port_city = st.number_input("Freight (from port to city) (Rs/t)", value=500, key=9)
-
-    china_landed_price = pd.DataFrame({
-        "HRC FOB China ($/t)": [CN_forecasted_value],
-        "Sea Freight ($/t)": [sea_freight],
-        "HRC CFR at Mumbai Port (A) ($/t)": [0],
-        "Insurance @1% on CFR ($/t)": [0],
-        "CIF / Assessable Value ($/t)": [0],
-        "Basic Customs Duty (%)": [basic_customs_duty],
-        "Basic Customs Duty (Absolute) ($/t)": [0],
-        "Social Welfare Surcharge @10% on BCD ($/t)": [0],
-        "Landed Value ($/t)": [0],
-        "Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)": [antidumping],
-        "MIP (5th Feb 2016 to 4th Aug 2016) ($/t)": [mip],
-        "Safeguard Duty (%)": [safeguard_duty],
-        "Safeguard Duty (Absolute) ($/t)": [0],
-        "Applicable SGD ($/t)": [applicable_SGD],
-        "LC Charges & Port Charges ($/t)": [LC_Port_charges],
-        "Landed Price at Port ($/t)": [0],
-        "Exchange Rate (INR/$)": [exchange_rate],
-        "Landed Price @ Mumbai Port (Rs/t)": [0],
-        "Freight (from port to city) (Rs/t)": [freight_port_city],
-        "HRC Basic Landed @ Mumbai Market (Rs/t)": [0]
-    })
-
-    # Recalculate rows that are dependent on other rows
-    china_landed_price["HRC CFR at Mumbai Port (A) ($/t)"] = china_landed_price["HRC FOB China ($/t)"] + china_landed_price["Sea Freight ($/t)"]
-    china_landed_price["Insurance @1% on CFR ($/t)"] = china_landed_price["HRC CFR at Mumbai Port (A) ($/t)"] * 0.01
-    china_landed_price["CIF / Assessable Value ($/t)"] = china_landed_price["Insurance @1% on CFR ($/t)"] + china_landed_price["HRC CFR at Mumbai Port (A) ($/t)"]
-    china_landed_price["Basic Customs Duty (Absolute) ($/t)"] = china_landed_price["CIF / Assessable Value ($/t)"] * (china_landed_price["Basic Customs Duty (%)"]/100)
-    china_landed_price["Social Welfare Surcharge @10% on BCD ($/t)"] = china_landed_price["Basic Customs Duty (Absolute) ($/t)"] * 0.1
-    china_landed_price["Landed Value ($/t)"] = china_landed_price["CIF / Assessable Value ($/t)"] + china_landed_price["Basic Customs Duty (Absolute) ($/t)"] + china_landed_price["Social Welfare Surcharge @10% on BCD ($/t)"]
-    china_landed_price["Safeguard Duty (Absolute) ($/t)"] = china_landed_price["Landed Value ($/t)"] * china_landed_price["Safeguard Duty (%)"]
-    china_landed_price["Landed Price at Port ($/t)"] = china_landed_price["LC Charges & Port Charges ($/t)"] + china_landed_price["Applicable SGD ($/t)"] + china_landed_price["Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)"] + china_landed_price["Landed Value ($/t)"] + china_landed_price["MIP (5th Feb 2016 to 4th Aug 2016) ($/t)"]
-    china_landed_price["Landed Price @ Mumbai Port (Rs/t)"] = china_landed_price["Exchange Rate (INR/$)"] * china_landed_price["Landed Price at Port ($/t)"]
-    china_landed_price["HRC Basic Landed @ Mumbai Market (Rs/t)"] = china_landed_price["Landed Price @ Mumbai Port (Rs/t)"] + china_landed_price["Freight (from port to city) (Rs/t)"]
-    
-    # Transform dataframe
-    china_landed_price_modified = china_landed_price.T
-    china_landed_price_modified.columns = ["Price"]
-    china_landed_price_modified.index.name = "Breakdown"
-    st.dataframe(china_landed_price_modified, use_container_width=True)
-    final_price = china_landed_price_modified["Price"]["HRC Basic Landed @ Mumbai Market (Rs/t)"]
-
-    # Display India landed price
-    st.markdown(f"<span style='color:#0080C7; font-weight:bold;'>The landed price of China's HRC in India is: ₹ {final_price:.0f}/t</span>", unsafe_allow_html=True)
-
-# --- India Landed Price (Japan) Calculator ---
-with col2:
-    st.subheader("Landed Price of Japan's HRC in India")
-
-    # Editable fields
-    sea_freight_JP = st.number_input("Sea Freight ($/t)", value=30, key=11)
-    basic_customs_duty_JP = st.number_input("Basic Customs Duty (%)", value=0, key=22)
-    antidumping_JP = st.number_input("Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)", value=0, key=33)
-    mip_JP = st.number_input("MIP (5th Feb 2016 to 4th Aug 2016) ($/t)", value=0, key=44)
-    safeguard_duty_JP = st.number_input("Safeguard Duty (%)", value=0, key=55)
-    applicable_SGD_JP = st.number_input("Applicable SGD ($/t)", value=0, key=66)
-    LC_Port_charges_JP = st.number_input("LC Charges & Port Charges ($/t)", value=10, key=77)
-    exchange_rate_JP = st.number_input("Exchange Rate (INR/$)", value=86, key=88)
-    freight_port_city_JP = st.number_input("Freight (from port to city) (Rs/t)", value=500, key=99)
-
-    japan_landed_price = pd.DataFrame({
-        "HRC FOB Japan ($/t)": [JP_forecasted_value],
-        "Sea Freight ($/t)": [sea_freight_JP],
-        "HRC CFR at Mumbai Port (A) ($/t)": [0],
-        "Insurance @1% on CFR ($/t)": [0],
-        "CIF / Assessable Value ($/t)": [0],
-        "Basic Customs Duty (%)": [basic_customs_duty_JP],
-        "Basic Customs Duty (Absolute) ($/t)": [0],
-        "Social Welfare Surcharge @10% on BCD ($/t)": [0],
-        "Landed Value ($/t)": [0],
-        "Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)": [antidumping_JP],
-        "MIP (5th Feb 2016 to 4th Aug 2016) ($/t)": [mip_JP],
-        "Safeguard Duty (%)": [safeguard_duty_JP],
-        "Safeguard Duty (Absolute) ($/t)": [0],
-        "Applicable SGD ($/t)": [applicable_SGD_JP],
-        "LC Charges & Port Charges ($/t)": [LC_Port_charges_JP],
-        "Landed Price at Port ($/t)": [0],
-        "Exchange Rate (INR/$)": [exchange_rate_JP],
-        "Landed Price @ Mumbai Port (Rs/t)": [0],
-        "Freight (from port to city) (Rs/t)": [freight_port_city_JP],
-        "HRC Basic Landed @ Mumbai Market (Rs/t)": [0]
-    })
-
-    # Recalculate rows that are dependent on other rows
-    japan_landed_price["HRC CFR at Mumbai Port (A) ($/t)"] = japan_landed_price["HRC FOB Japan ($/t)"] + japan_landed_price["Sea Freight ($/t)"]
-    japan_landed_price["Insurance @1% on CFR ($/t)"] = japan_landed_price["HRC CFR at Mumbai Port (A) ($/t)"] * 0.01
-    japan_landed_price["CIF / Assessable Value ($/t)"] = japan_landed_price["Insurance @1% on CFR ($/t)"] + japan_landed_price["HRC CFR at Mumbai Port (A) ($/t)"]
-    japan_landed_price["Basic Customs Duty (Absolute) ($/t)"] = japan_landed_price["CIF / Assessable Value ($/t)"] * (japan_landed_price["Basic Customs Duty (%)"]/100)
-    japan_landed_price["Social Welfare Surcharge @10% on BCD ($/t)"] = japan_landed_price["Basic Customs Duty (Absolute) ($/t)"] * 0.1
-    japan_landed_price["Landed Value ($/t)"] = japan_landed_price["CIF / Assessable Value ($/t)"] + japan_landed_price["Basic Customs Duty (Absolute) ($/t)"] + japan_landed_price["Social Welfare Surcharge @10% on BCD ($/t)"]
-    japan_landed_price["Safeguard Duty (Absolute) ($/t)"] = japan_landed_price["Landed Value ($/t)"] * japan_landed_price["Safeguard Duty (%)"]
-    japan_landed_price["Landed Price at Port ($/t)"] = japan_landed_price["LC Charges & Port Charges ($/t)"] + japan_landed_price["Applicable SGD ($/t)"] + japan_landed_price["Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)"] + japan_landed_price["Landed Value ($/t)"] + japan_landed_price["MIP (5th Feb 2016 to 4th Aug 2016) ($/t)"]
-    japan_landed_price["Landed Price @ Mumbai Port (Rs/t)"] = japan_landed_price["Exchange Rate (INR/$)"] * japan_landed_price["Landed Price at Port ($/t)"]
-    japan_landed_price["HRC Basic Landed @ Mumbai Market (Rs/t)"] = japan_landed_price["Landed Price @ Mumbai Port (Rs/t)"] + japan_landed_price["Freight (from port to city) (Rs/t)"]
-    
-    # Transform dataframe
-    japan_landed_price_modified = japan_landed_price.T
-    japan_landed_price_modified.columns = ["Price"]
-    japan_landed_price_modified.index.name = "Breakdown"
-    st.dataframe(japan_landed_price_modified, use_container_width=True)
-    final_price_JP = japan_landed_price_modified["Price"]["HRC Basic Landed @ Mumbai Market (Rs/t)"]
-
-    # Display India landed price
-    st.markdown(f"<span style='color:#0080C7; font-weight:bold;'>The landed price of Japan's HRC in India is: ₹ {final_price_JP:.0f}/t</span>", unsafe_allow_html=True)
-    
\ No newline at end of file
+# Keep the timing record of a finished run, for the timing panel
+def record_run(run):
+    runs = st.session_state.setdefault("timing_runs", [])
+    runs.append(finish_run(run))
+    del runs[:-TIMING_HISTORY]
+    return runs
+
+# Landed price breakdown of one origin, recomputed only when its FOB price or its own inputs change
+def origin_breakdown(origin, fob, inputs):
+    key = (float(fob), tuple(inputs.items()))
+    breakdowns = st.session_state.setdefault("breakdowns", {})
+    if origin not in breakdowns or breakdowns[origin][0] != key:
+        breakdowns[origin] = (key, breakdown_table(fob, inputs, origin))
+    return breakdowns[origin][1]
+
+# --- Landed price calculators and tables ---
+# A fragment: editing a landed price input, the month, the routes or the break-even settings reruns only this section
+# with the forecast of the last full run, so the forecast is not recomputed and the chart is not redrawn.
+@st.experimental_fragment
+def landed_price_section(CN_JP_forecast):
+    # A rerun of the fragment alone is timed as a run of its own
+    fragment_run = start_run(label="landed_price", enabled=debug) if current_run() is None else None
+
+    # Obtain list of forecasted dates
+    date_options = CN_JP_forecast.index.tolist()
+
+    # Dropdown for date selection
+    selected_date = st.selectbox("📅 Select Month for Landed Price Calculation", date_options)
+
+    # Obtain China's and Japan's forecasted HRC price
+    CN_forecasted_value = CN_JP_forecast.loc[selected_date, 'China HRC Forecast (FOB, $/t)']
+    JP_forecasted_value = CN_JP_forecast.loc[selected_date, 'Japan HRC Forecast (FOB, $/t)']
+
+    col1, col2 = st.columns(2)
+    # --- India Landed Price (China) Calculator ---
+    with col1:
+        st.subheader("Landed Price of China's HRC in India")
+
+        # Editable fields
+        sea_freight = st.number_input("Sea Freight ($/t)", value=30, key=1)
+        basic_customs_duty = st.number_input("Basic Customs Duty (%)", value=7.5, key=2)
+        antidumping = st.number_input("Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)", value=0, key=3)
+        mip = st.number_input("MIP (5th Feb 2016 to 4th Aug 2016) ($/t)", value=0, key=4)
+        safeguard_duty = st.number_input("Safeguard Duty (%)", value=0, key=5)
+        applicable_SGD = st.number_input("Applicable SGD ($/t)", value=0, key=6)
+        LC_Port_charges = st.number_input("LC Charges & Port Charges ($/t)", value=10, key=7)
+        exchange_rate = st.number_input("Exchange Rate (INR/$)", value=86, key=8)
+        freight_port_city = st.number_input("Freight (from port to city) (Rs/t)", value=500, key=9)
+
+        china_inputs = dict(sea_freight=sea_freight, basic_customs_duty=basic_customs_duty, antidumping=antidumping, mip=mip,
+                            safeguard_duty=safeguard_duty, applicable_sgd=applicable_SGD, lc_port_charges=LC_Port_charges,
+                            exchange_rate=exchange_rate, freight_port_city=freight_port_city)
+
+        # Calculate the landed price breakdown
+        with span("landed_price_china"):
+            china_landed_price_modified = origin_breakdown("China", CN_forecasted_value, china_inputs)
+            st.dataframe(china_landed_price_modified, use_container_width=True)
+        final_price = china_landed_price_modified["Price"]["HRC Basic Landed @ Mumbai Market (Rs/t)"]
+
+        # Display India landed price
+        st.markdown(f"<span style='color:#0080C7; font-weight:bold;'>The landed price of China's HRC in India is: ₹ {final_price:.0f}/t</span>", unsafe_allow_html=True)
+
+    # --- India Landed Price (Japan) Calculator ---
+    with col2:
+        st.subheader("Landed Price of Japan's HRC in India")
+
+        # Editable fields
+        sea_freight_JP = st.number_input("Sea Freight ($/t)", value=30, key=11)
+        basic_customs_duty_JP = st.number_input("Basic Customs Duty (%)", value=0, key=22)
+        antidumping_JP = st.number_input("Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)", value=0, key=33)
+        mip_JP = st.number_input("MIP (5th Feb 2016 to 4th Aug 2016) ($/t)", value=0, key=44)
+        safeguard_duty_JP = st.number_input("Safeguard Duty (%)", value=0, key=55)
+        applicable_SGD_JP = st.number_input("Applicable SGD ($/t)", value=0, key=66)
+        LC_Port_charges_JP = st.number_input("LC Charges & Port Charges ($/t)", value=10, key=77)
+        exchange_rate_JP = st.number_input("Exchange Rate (INR/$)", value=86, key=88)
+        freight_port_city_JP = st.number_input("Freight (from port to city) (Rs/t)", value=500, key=99)
+
+        japan_inputs = dict(sea_freight=sea_freight_JP, basic_customs_duty=basic_customs_duty_JP, antidumping=antidumping_JP, mip=mip_JP,
+                            safeguard_duty=safeguard_duty_JP, applicable_sgd=applicable_SGD_JP, lc_port_charges=LC_Port_charges_JP,
+                            exchange_rate=exchange_rate_JP, freight_port_city=freight_port_city_JP)
+
+        # Calculate the landed price breakdown
+        with span("landed_price_japan"):
+            japan_landed_price_modified = origin_breakdown("Japan", JP_forecasted_value, japan_inputs)
+            st.dataframe(japan_landed_price_modified, use_container_width=True)
+        final_price_JP = japan_landed_price_modified["Price"]["HRC Basic Landed @ Mumbai Market (Rs/t)"]
+
+        # Display India landed price
+        st.markdown(f"<span style='color:#0080C7; font-weight:bold;'>The landed price of Japan's HRC in India is: ₹ {final_price_JP:.0f}/t</span>", unsafe_allow_html=True)
+
+
+    # --- Landed prices for every forecast month ---
+    inputs_by_origin = {"China": china_inputs, "Japan": japan_inputs}
+    st.subheader("Landed Price of China's and Japan's HRC in India by Month")
+    with span("landed_price_table"):
+        st.dataframe(landed_price_table(CN_JP_forecast, inputs_by_origin).style.format("₹ {:.0f}"), use_container_width=True)
+
+    # --- Landed prices across destination ports and cities ---
+    with st.expander("Landed price by destination port and city (Rs/t)"):
+        # Editable list of routes, starting from the Mumbai route used by the calculators above
+        default_routes = pd.DataFrame({
+            "Port": ["Mumbai"],
+            "City": ["Mumbai"],
+            "Sea Freight China ($/t)": [sea_freight],
+            "Sea Freight Japan ($/t)": [sea_freight_JP],
+            "Freight (from port to city) (Rs/t)": [freight_port_city],
+        })
+        routes = st.data_editor(default_routes, num_rows="dynamic", use_container_width=True, key="routes").dropna()
+        if len(routes) > 0:
+            with span("route_matrix"):
+                st.dataframe(route_matrix(CN_JP_forecast, inputs_by_origin, routes).style.format("₹ {:.0f}"), use_container_width=True)
+
+    # --- Break-even levels at which imports match the domestic price ---
+    with st.expander("Break-even analysis against the domestic price"):
+        domestic_price = st.number_input("Domestic HRC price @ Mumbai Market (Rs/t)", value=50000, step=500, key="domestic_price")
+        solve_for = st.selectbox("Solve for", options=list(BREAK_EVEN_INPUTS), format_func=BREAK_EVEN_INPUTS.get, key="solve_for")
+        with span("break_even"):
+            st.dataframe(break_even_table(CN_JP_forecast, inputs_by_origin, solve_for, domestic_price).style.format("{:.2f}"), use_container_width=True)
+
+    if fragment_run is not None:
+        record_run(fragment_run)
+
+landed_price_section(CN_JP_forecast)
+
+# --- Stage timings of the last reruns ---
+if debug:
+    runs = record_run(timing_run)
+    with st.sidebar.expander(f"Stage timings of the last {len(runs)} reruns (ms)", expanded=True):
+        st.dataframe(stage_table(runs[::-1]).style.format("{:.1f}", na_rep=""), use_container_width=True)
+        stats = result_cache.stats()
+        st.caption(f"Result cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%}), {stats['entries']} entries, "
+                   f"{stats['bytes'] / 2**20:.1f} of {stats['max_bytes'] / 2**20:.0f} MB, {stats['evictions']} evictions, {stats['invalidations']} invalidations")
@@ -0,0 +1,94 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import os
+import time
+from china_japan import load_data, fit_params, final_cols, forecast_steps, selected_lag_order
+from inference import var_forecast, integrate, log_trans_array, predict_linear
+from origins import predict_origins
+
+# --- Walk-forward backtest of the VAR + MLR + Japan pipeline ---
+# At every origin the full chain is refitted on the data available up to that month (differenced VAR -> log_trans MLR
+# -> China-to-Japan regression), and China's and Japan's HRC prices are forecast for horizons 1 to 17.
+MIN_TRAIN = 60
+
+# Data shared by the worker processes, set once per worker by _init_worker
+_data = {}
+
+def _init_worker(df, hrc_price_CN_JP):
+    _data['df'] = df
+    _data['hrc_price_CN_JP'] = hrc_price_CN_JP
+
+# Refit the chain on the first `origin` months and forecast the following steps. Without a lag_order, the order is
+# selected on those months as the dashboard selects it on the full history.
+# Returns China's and Japan's forecasts, each of length steps.
+def forecast_from_origin(df, hrc_price_CN_JP, origin, steps=forecast_steps, lag_order=None):
+    train_df = df.iloc[:origin]
+    train_CN_JP = hrc_price_CN_JP.loc[hrc_price_CN_JP.index < df.index[origin]]
+    if lag_order is None:
+        lag_order = selected_lag_order(train_df)
+    params = fit_params(train_df, train_CN_JP, lag_order=lag_order)
+
+    # VAR forecast of the independent variables, with differencing inverted
+    levels = integrate(train_df[final_cols].values[-1], var_forecast(params['var_coefs'], params['var_intercept'], params['last_diff'], steps))
+
+    # China's forecast from the log-transformed X variables, then Japan's forecast from China's
+    china = predict_linear(log_trans_array(levels[:, 1:]), params['cn_coef'], params['cn_intercept'])
+    japan = predict_origins(china, params['origin_coefs'])[:, list(params['origin_names']).index('Japan')]
+    return china, japan
+
+def _run_origins(origins):
+    return [forecast_from_origin(_data['df'], _data['hrc_price_CN_JP'], origin) for origin in origins]
+
+# Error metrics per horizon, ignoring horizons that run past the end of the data
+def _horizon_metrics(forecasts, actuals):
+    errors = forecasts - actuals
+    with np.errstate(invalid='ignore'):
+        return pd.DataFrame({
+            'MAE': np.nanmean(np.abs(errors), axis=0),
+            'RMSE': np.sqrt(np.nanmean(errors ** 2, axis=0)),
+            'MAPE': np.nanmean(np.abs(errors / actuals), axis=0) * 100,
+            'N': np.sum(~np.isnan(errors), axis=0),
+        }, index=pd.RangeIndex(1, forecasts.shape[1] + 1, name='Horizon'))
+
+# Run the backtest over every origin from min_train to the last month, fanning the origins out over a process pool.
+# Returns MAE/RMSE/MAPE per horizon for China and Japan.
+def run_backtest(df=None, hrc_price_CN_JP=None, min_train=MIN_TRAIN, steps=forecast_steps, workers=None, chunk_size=8):
+    if df is None:
+        df, hrc_price_CN_JP = load_data()
+    origins = list(range(min_train, len(df)))
+    chunks = [origins[i:i + chunk_size] for i in range(0, len(origins), chunk_size)]
+
+    if workers == 1:
+        _init_worker(df, hrc_price_CN_JP)
+        results = [_run_origins(chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_worker, initargs=(df, hrc_price_CN_JP)) as pool:
+            results = list(pool.map(_run_origins, chunks))
+    china = np.array([cn for chunk in results for cn, jp in chunk])
+    japan = np.array([jp for chunk in results for cn, jp in chunk])
+
+    # Actual prices at each origin and horizon, NaN past the end of the data
+    dates = pd.DatetimeIndex([df.index[origin] for origin in origins])
+    target_dates = [pd.date_range(start=date, periods=steps, freq='MS') for date in dates]
+    china_actual = np.array([df['HRC (FOB, $/t)'].reindex(d).values for d in target_dates])
+    japan_actual = np.array([hrc_price_CN_JP['Japan HRC (FOB, $/t)'].reindex(d).values for d in target_dates])
+
+    return pd.concat({'China': _horizon_metrics(china, china_actual), 'Japan': _horizon_metrics(japan, japan_actual)}, axis=1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the China and Japan HRC forecasts")
+    parser.add_argument("--min-train", type=int, default=MIN_TRAIN, help="number of months in the first training window")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="optional csv path for the results")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_backtest(min_train=args.min_train, workers=args.workers)
+    print(results.round(2).to_string())
+    print(f"Backtest finished in {time.perf_counter() - start:.1f}s")
+    if args.output:
+        results.to_csv(args.output)
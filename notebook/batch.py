@@ -0,0 +1,137 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import argparse
+import os
+import sys
+import time
+from china_japan import get_fitted_model, forecast_scenarios, forecast_table, SCENARIO_INPUTS, DEFAULT_UPSIDE, DEFAULT_DOWNSIDE
+from landed_price import landed_price_breakdown, INPUT_NAMES, FINAL_ROW, DEFAULT_LANDED_INPUTS
+
+# --- Batch scenario runs from a csv ---
+# Each input row is one scenario: the ten sidebar drivers (iron_ore_up ... fai_down, as in generate_forecast) and the
+# landed price inputs of each origin (china_sea_freight ... japan_freight_port_city). Columns that are left out take the
+# dashboard's default values, and an optional 'scenario' column names each row.
+# The csv is read in chunks, chunks are scored across a process pool, and results are appended to the output csv in
+# input order as chunks complete, so memory stays bounded by the chunks in flight whatever the size of the file.
+DEFAULT_CHUNK_SIZE = 1000
+ORIGINS = list(DEFAULT_LANDED_INPUTS)
+
+# Input columns with their default values
+DEFAULTS = {**{f"{name}_up": value for name, value in DEFAULT_UPSIDE.items()},
+            **{f"{name}_down": value for name, value in DEFAULT_DOWNSIDE.items()},
+            **{f"{origin.lower()}_{name}": value for origin, inputs in DEFAULT_LANDED_INPUTS.items() for name, value in inputs.items()}}
+
+# Model shared by the scenarios of one worker process, loaded once by _init_worker
+_worker = {}
+
+def _init_worker():
+    model = get_fitted_model()
+    months = forecast_table(model).index
+    _worker['model'] = model
+    _worker['months'] = months
+
+    # Positions of the table months in China's and Japan's forecast periods
+    _worker['cn_cols'] = np.flatnonzero(np.isin(model.forecast_period.strftime('%b-%y'), months))
+    _worker['jp_cols'] = np.flatnonzero(np.isin(model.fc_period_JP.strftime('%b-%y'), months))
+    _worker['base'] = {'China': model.final_forecast.values[_worker['cn_cols'], 0], 'Japan': model.df_forecast_JP.values[_worker['jp_cols'], 0]}
+
+# Validate the columns of an input chunk and fill in the defaults
+def prepare_chunk(chunk, start):
+    unknown = set(chunk.columns) - set(DEFAULTS) - {'scenario'}
+    if unknown:
+        raise ValueError(f"Unknown columns: {sorted(unknown)}")
+    chunk = chunk.reindex(columns=['scenario'] + list(DEFAULTS))
+    if chunk['scenario'].isna().all():
+        chunk['scenario'] = np.arange(start, start + len(chunk))
+    return chunk.fillna(DEFAULTS)
+
+# Score a chunk of scenarios: one row per scenario and forecast month
+def run_chunk(chunk):
+    model, months = _worker['model'], _worker['months']
+    n = len(chunk)
+    paths = {}
+    for side in ['up', 'down']:
+        china, japan = forecast_scenarios(model, chunk[[f"{name}_{side}" for name in SCENARIO_INPUTS]].values)
+        paths[side] = {'China': china, 'Japan': japan}
+
+    out = {'scenario': np.repeat(chunk['scenario'].values, len(months)), 'Month': np.tile(months, n)}
+    for origin in ORIGINS:
+        cols = _worker['cn_cols'] if origin == 'China' else _worker['jp_cols']
+        fob = {'base': np.broadcast_to(_worker['base'][origin], (n, len(months))), 'up': paths['up'][origin][:, cols], 'down': paths['down'][origin][:, cols]}
+        inputs = {name: chunk[f"{origin.lower()}_{name}"].values[:, None] for name in INPUT_NAMES}
+        out[f"{origin} HRC Forecast (FOB, $/t)"] = fob['base'].reshape(-1)
+        out[f"{origin} HRC Upside (FOB, $/t)"] = fob['up'].reshape(-1)
+        out[f"{origin} HRC Downside (FOB, $/t)"] = fob['down'].reshape(-1)
+        for case, label in [('base', ''), ('up', ' Upside'), ('down', ' Downside')]:
+            out[f"{origin} Landed Price{label} (Rs/t)"] = landed_price_breakdown(fob[case], **inputs)[FINAL_ROW].reshape(-1)
+    return pd.DataFrame(out)
+
+# Read the input csv chunk by chunk and yield prepared chunks
+def read_chunks(input_path, chunk_size):
+    start = 0
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+        yield prepare_chunk(chunk, start)
+        start += len(chunk)
+
+# Run every scenario of input_path and write the results to output_path. At most max_in_flight chunks are read ahead
+# of the writer. Returns the number of scenarios.
+def run_batch(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, max_in_flight=None):
+    workers = workers or os.cpu_count()
+    max_in_flight = max_in_flight or 2 * workers
+    chunks = read_chunks(input_path, chunk_size)
+    n_scenarios = 0
+    header = True
+
+    def write(result):
+        nonlocal header
+        result.to_csv(output_path, mode='w' if header else 'a', header=header, index=False)
+        header = False
+
+    if workers == 1:
+        _init_worker()
+        for chunk in chunks:
+            write(run_chunk(chunk))
+            n_scenarios += len(chunk)
+        return n_scenarios
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Keep a bounded window of submitted chunks and write them out in input order
+        pending = [(len(chunk), pool.submit(run_chunk, chunk)) for chunk in islice(chunks, max_in_flight)]
+        while pending:
+            size, future = pending.pop(0)
+            write(future.result())
+            n_scenarios += size
+            for chunk in islice(chunks, 1):
+                pending.append((len(chunk), pool.submit(run_chunk, chunk)))
+    return n_scenarios
+
+def write_template(path, n_rows=1):
+    template = pd.DataFrame([DEFAULTS] * n_rows)
+    template.insert(0, 'scenario', [f"scenario_{i + 1}" for i in range(n_rows)])
+    template.to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a csv of driver and landed price scenarios through the forecast and landed price calculation")
+    parser.add_argument("input", nargs="?", help="csv with one scenario per row")
+    parser.add_argument("output", nargs="?", help="csv for the results, one row per scenario and forecast month")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="scenarios per chunk")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--template", default=None, help="write a template input csv with the default values and exit")
+    args = parser.parse_args()
+
+    if args.template:
+        write_template(args.template)
+        sys.exit(0)
+    if not (args.input and args.output):
+        parser.error("input and output are required")
+
+    start = time.perf_counter()
+    try:
+        n_scenarios = run_batch(args.input, args.output, args.chunk_size, args.workers)
+    except ValueError as e:
+        parser.exit(1, f"error: {e}\n")
+    print(f"Wrote {n_scenarios} scenarios to {args.output} in {time.perf_counter() - start:.1f}s")
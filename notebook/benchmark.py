@@ -0,0 +1,259 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import warnings
+import snapshot
+from snapshot import read_csv_snapshot
+from china_japan import (load_data, fit_forecast_model, evaluate_scenario, generate_forecast, forecast_scenarios,
+                         invert_transformation, log_trans, final_cols, list_of_variables, scenario_drivers, forecast_steps,
+                         selected_lag_order, SCENARIO_INPUTS, DEFAULT_UPSIDE, DEFAULT_DOWNSIDE)
+from landed_price import landed_price_breakdown, FINAL_ROW, DEFAULT_LANDED_INPUTS
+from incremental import IncrementalModel
+from lag_selection import lag_order_criteria, CRITERIA
+
+# --- Benchmark suite for the forecasting and landed-price paths ---
+# Every stage is timed on the real wo_na.csv and on synthetic datasets scaled in rows and columns, and every fast path
+# is checked numerically against a reference implementation written the way the original generate_forecast computed it.
+# Column scaling only widens the fitting stages (VAR, lag selection, regression, csv load): the forecast chain itself
+# always runs on the shortlisted variables.
+DEFAULT_SCALES = ['1x1', '10x1', '100x1', '1000x1', '10x10']
+DEFAULT_TOLERANCE = 0.25
+MIN_SLACK = 0.005
+MAX_LAGS = 12
+
+# Default scenario inputs of the dashboard sidebar, in the positional order of evaluate_scenario
+UPSIDE = [DEFAULT_UPSIDE[name] for name in SCENARIO_INPUTS]
+DOWNSIDE = [DEFAULT_DOWNSIDE[name] for name in SCENARIO_INPUTS]
+LANDED_INPUTS = DEFAULT_LANDED_INPUTS['China']
+
+# Relative tolerance of each numerical check
+CHECK_TOLERANCE = 1e-8
+
+# --- Synthetic datasets ---
+# Rows are scaled by tiling the real history with a little noise, which keeps every series at a realistic level;
+# columns are scaled by adding noisy copies of the shortlisted variables. Synthetic dates are hourly so that even
+# 1000x the history fits in pandas' timestamp range, ending on the last real month so the forecast dates are unchanged.
+def synthetic_dataset(df, hrc_price_CN_JP, row_scale=1, col_scale=1, seed=0):
+    if row_scale == 1 and col_scale == 1:
+        return df, hrc_price_CN_JP
+    rng = np.random.default_rng(seed)
+    base = df[final_cols]
+    n = len(base) * row_scale
+    scale = base.std().values
+
+    values = np.tile(base.values, (row_scale, 1)) + rng.normal(0, 0.01, (n, len(final_cols))) * scale
+    index = pd.date_range(end=base.index[-1], periods=n, freq='h', name='Date') if row_scale > 1 else base.index
+    synthetic = pd.DataFrame(values, index=index, columns=final_cols)
+    for j in range(1, col_scale):
+        extra = np.tile(base.values[:, 1:], (row_scale, 1)) + rng.normal(0, 0.05, (n, len(list_of_variables))) * scale[1:]
+        synthetic[[f"{col} #{j}" for col in list_of_variables]] = extra
+
+    # Japan's prices follow China's synthetic prices, followed by the real months after the end of the VAR history
+    china = synthetic['HRC (FOB, $/t)'].values
+    japan = 0.9 * china + 40 + rng.normal(0, 10, n)
+    after = hrc_price_CN_JP.loc[hrc_price_CN_JP.index > base.index[-1]]
+    synthetic_CN_JP = pd.concat([pd.DataFrame({'China HRC (FOB, $/t)': china[:-1], 'Japan HRC (FOB, $/t)': japan[:-1]}, index=index[:-1]),
+                                 hrc_price_CN_JP.loc[[base.index[-1]]], after])
+    return synthetic, synthetic_CN_JP
+
+# --- Reference implementations ---
+# The forecast chain as the original generate_forecast computed it: statsmodels' forecast with invert_transformation,
+# and sklearn's predict on log_trans'd DataFrames, one DataFrame per scenario.
+def reference_forecast(df, hrc_price_CN_JP, drivers, jp_mask):
+    from statsmodels.tsa.api import VAR
+    from sklearn.linear_model import LinearRegression
+
+    final_df = df[final_cols]
+    final_df_differenced = final_df.diff().dropna()
+    model_fitted = VAR(final_df_differenced).fit(selected_lag_order(final_df))
+    fc = model_fitted.forecast(y=final_df_differenced.values[-model_fitted.k_ar:], steps=forecast_steps)
+    df_forecast_processed = invert_transformation(final_df, pd.DataFrame(fc, columns=final_df.columns + '_1d'))
+    var_levels = df_forecast_processed[[col + '_forecast' for col in final_cols]]
+    forecasted_X = var_levels[[col + '_forecast' for col in list_of_variables]]
+    forecasted_X.columns = list_of_variables
+
+    lr_model = LinearRegression().fit(log_trans(df[list_of_variables]), df['HRC (FOB, $/t)'])
+    model_JP = LinearRegression().fit(hrc_price_CN_JP[["China HRC (FOB, $/t)"]], hrc_price_CN_JP["Japan HRC (FOB, $/t)"])
+    anchor = df['HRC (FOB, $/t)'].iloc[-1]
+
+    def china_japan(X):
+        china = np.insert(lr_model.predict(log_trans(X)), 0, anchor)
+        return china, model_JP.predict(pd.DataFrame({"China HRC (FOB, $/t)": china[jp_mask]}))
+
+    china, japan = china_japan(forecasted_X)
+    scenario_china, scenario_japan = [], []
+    for row in drivers:
+        up_down_df = forecasted_X.copy()
+        up_down_df[scenario_drivers] = row
+        cn, jp = china_japan(up_down_df)
+        scenario_china.append(cn)
+        scenario_japan.append(jp)
+    return {'var_levels': var_levels.values, 'china': china, 'japan': japan,
+            'scenario_china': np.array(scenario_china), 'scenario_japan': np.array(scenario_japan)}
+
+# Landed price of one FOB value, written out element by element as in the dashboard's original calculator
+def reference_landed_price(fob, sea_freight, basic_customs_duty, antidumping, mip, safeguard_duty, applicable_sgd, lc_port_charges, exchange_rate, freight_port_city):
+    cfr = fob + sea_freight
+    cif = cfr * 0.01 + cfr
+    bcd = cif * (basic_customs_duty / 100)
+    landed_value = cif + bcd + bcd * 0.1
+    port_price = lc_port_charges + applicable_sgd + antidumping + landed_value + mip
+    return exchange_rate * port_price + freight_port_city
+
+# --- Timing helpers ---
+# Best of `repeats` wall times of fn(), together with its last result
+def timed(fn, repeats):
+    best, result = np.inf, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def _relative_diff(actual, expected):
+    actual, expected = np.asarray(actual, dtype=float), np.asarray(expected, dtype=float)
+    return float(np.max(np.abs(actual - expected) / np.maximum(np.abs(expected), 1.0)))
+
+# Time every stage on one dataset and run the numerical checks. Returns (timings, checks) as lists of records.
+def run_dataset(name, df, hrc_price_CN_JP, repeats=3, n_scenarios=10000):
+    from statsmodels.tsa.api import VAR
+    from sklearn.linear_model import LinearRegression
+    warnings.filterwarnings("ignore")
+
+    timings, checks = [], []
+    record = lambda stage, seconds: timings.append({'dataset': name, 'rows': len(df), 'cols': df.shape[1], 'stage': stage, 'seconds': seconds})
+    check = lambda what, diff: checks.append({'dataset': name, 'check': what, 'max_rel_diff': diff, 'tolerance': CHECK_TOLERANCE, 'passed': diff <= CHECK_TOLERANCE})
+
+    # Load: csv parse against the binary snapshot, with snapshots written to a scratch folder
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = Path(tmp) / f"{name}.csv"
+        df.reset_index().to_csv(csv_path, index=False)
+        record('load_csv', timed(lambda: pd.read_csv(csv_path).set_index('Date'), repeats)[0])
+        snapshot_root, snapshot.SNAPSHOT_ROOT = snapshot.SNAPSHOT_ROOT, Path(tmp) / "snapshots"
+        try:
+            read_csv_snapshot(csv_path)
+            seconds, loaded = timed(lambda: read_csv_snapshot(csv_path), repeats)
+        finally:
+            snapshot.SNAPSHOT_ROOT = snapshot_root
+        record('load_snapshot', seconds)
+        check('snapshot vs read_csv', _relative_diff(loaded.values, pd.read_csv(csv_path).set_index('Date').values))
+
+    # Fitting stages on every column of the dataset
+    differenced = df.diff().dropna()
+    lag_order = selected_lag_order(df)
+    record('var_fit', timed(lambda: VAR(differenced).fit(lag_order), repeats)[0])
+    k = differenced.shape[1]
+    if len(differenced) - MAX_LAGS > k * MAX_LAGS + 1:
+        seconds, criteria = timed(lambda: lag_order_criteria(differenced.values, MAX_LAGS), repeats)
+        record('lag_selection', seconds)
+        seconds, selected = timed(lambda: VAR(differenced).select_order(maxlags=MAX_LAGS), repeats)
+        record('lag_selection_statsmodels', seconds)
+        check('lag criteria', max(_relative_diff(criteria[c].values, selected.ics[c]) for c in CRITERIA))
+    else:
+        record('lag_selection', None)
+        record('lag_selection_statsmodels', None)
+    X = log_trans(df.drop(columns='HRC (FOB, $/t)'))
+    record('regression_fit', timed(lambda: LinearRegression().fit(X, df['HRC (FOB, $/t)']), repeats)[0])
+
+    # Forecast chain on the shortlisted variables
+    seconds, model = timed(lambda: fit_forecast_model(df, hrc_price_CN_JP), repeats)
+    record('model_build', seconds)
+    drivers = np.array([UPSIDE, DOWNSIDE], dtype=float)
+    record('scenario_predict', timed(lambda: forecast_scenarios(model, drivers), repeats)[0])
+    batch = np.random.default_rng(0).uniform(drivers.min(axis=0), drivers.max(axis=0), (n_scenarios, len(scenario_drivers)))
+    record('scenario_batch', timed(lambda: forecast_scenarios(model, batch), repeats)[0])
+    evaluate_scenario(model, *UPSIDE, *DOWNSIDE, ["China", "Japan"])
+    record('figure_build', timed(lambda: evaluate_scenario(model, *UPSIDE, *DOWNSIDE, ["China", "Japan"]), repeats)[0])
+    record('end_to_end', timed(lambda: evaluate_scenario(fit_forecast_model(df, hrc_price_CN_JP), *UPSIDE, *DOWNSIDE, ["China", "Japan"]), repeats)[0])
+
+    reference = reference_forecast(df, hrc_price_CN_JP, drivers, model.jp_mask)
+    china, japan = forecast_scenarios(model, drivers)
+    check('VAR forecast', _relative_diff(model.df_forecast_processed.values, reference['var_levels']))
+    check('China forecast', _relative_diff(model.final_forecast.values[:, 0], reference['china']))
+    check('Japan forecast', _relative_diff(model.df_forecast_JP.values[1:, 0], reference['japan']))
+    check('China scenarios', _relative_diff(china, reference['scenario_china']))
+    check('Japan scenarios', _relative_diff(japan[:, 1:], reference['scenario_japan']))
+
+    # Incremental update against a full refit
+    inc = IncrementalModel(df.iloc[:-1], hrc_price_CN_JP, lag_order=model.k_ar)
+    record('incremental_update', timed(lambda: inc.add_month(df.iloc[-1]), 1)[0])
+    check('incremental update', max(_relative_diff(inc.params()[p], model.params[p]) for p in ('var_coefs', 'var_intercept', 'cn_coef', 'cn_intercept')))
+
+    # Landed price over months x origins x routes, scaled with the dataset
+    rng = np.random.default_rng(0)
+    fob = rng.uniform(400, 700, (len(df), 2, 10))
+    inputs = {name: np.broadcast_to(value, fob.shape) for name, value in LANDED_INPUTS.items()}
+    inputs['sea_freight'] = rng.uniform(20, 60, fob.shape)
+    seconds, landed = timed(lambda: landed_price_breakdown(fob, **inputs)[FINAL_ROW], repeats)
+    record('landed_price', seconds)
+    sample = rng.choice(fob.size, min(fob.size, 2000), replace=False)
+    expected = [reference_landed_price(fob.flat[i], **{name: value.flat[i] for name, value in inputs.items()}) for i in sample]
+    check('landed price', _relative_diff(landed.flat[sample], expected))
+    return timings, checks
+
+# Stages slower than the baseline by more than the tolerance (plus a small absolute slack for very fast stages)
+def find_regressions(timings, baseline, tolerance=DEFAULT_TOLERANCE):
+    previous = {(r['dataset'], r['stage']): r['seconds'] for r in baseline['timings']}
+    regressions = []
+    for r in timings:
+        before = previous.get((r['dataset'], r['stage']))
+        if before is not None and r['seconds'] is not None and r['seconds'] > before * (1 + tolerance) + MIN_SLACK:
+            regressions.append({**r, 'baseline_seconds': before})
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the forecasting and landed-price paths on real and synthetic datasets")
+    parser.add_argument("--scales", nargs="+", default=DEFAULT_SCALES, help="dataset scales as ROWSxCOLS multiples of wo_na.csv")
+    parser.add_argument("--repeats", type=int, default=3, help="timing repeats per stage (the best run is reported)")
+    parser.add_argument("--output", default=None, help="json file for the results")
+    parser.add_argument("--baseline", default=None, help="json results of an earlier run to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown against the baseline, as a fraction")
+    args = parser.parse_args()
+
+    df, hrc_price_CN_JP = load_data()
+    timings, checks = [], []
+    for scale in args.scales:
+        row_scale, col_scale = (int(v) for v in scale.lower().split('x'))
+        synthetic, synthetic_CN_JP = synthetic_dataset(df[final_cols], hrc_price_CN_JP, row_scale, col_scale)
+        t, c = run_dataset(scale, synthetic, synthetic_CN_JP, args.repeats)
+        timings += t
+        checks += c
+        for r in t:
+            print(f"{scale:>8} {r['stage']:<26} " + ("skipped" if r['seconds'] is None else f"{r['seconds'] * 1e3:10.2f} ms"))
+
+    # Warm dashboard call on the real data, served from the fitted model cache
+    generate_forecast(*UPSIDE, *DOWNSIDE, ["China", "Japan"])
+    seconds = timed(lambda: generate_forecast(*UPSIDE, *DOWNSIDE, ["China", "Japan"]), args.repeats)[0]
+    timings.append({'dataset': 'real', 'rows': len(df), 'cols': len(final_cols), 'stage': 'generate_forecast_warm', 'seconds': seconds})
+    print(f"{'real':>8} {'generate_forecast_warm':<26} {seconds * 1e3:10.2f} ms")
+
+    results = {
+        'meta': {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+                 'machine': platform.machine(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'repeats': args.repeats},
+        'timings': timings,
+        'checks': checks,
+    }
+    failed = [c for c in checks if not c['passed']]
+    for c in failed:
+        print(f"FAIL {c['dataset']} {c['check']}: max relative difference {c['max_rel_diff']:.2e}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            results['regressions'] = find_regressions(timings, json.load(f), args.tolerance)
+        for r in results['regressions']:
+            print(f"SLOWER {r['dataset']} {r['stage']}: {r['seconds'] * 1e3:.2f} ms vs {r['baseline_seconds'] * 1e3:.2f} ms")
+        failed += results['regressions']
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
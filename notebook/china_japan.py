@@ -1,10 +1,16 @@
 # --- Import libraries ---
 import numpy as np 
 import pandas as pd 
-from statsmodels.tsa.api import VAR
-import plotly.graph_objects as go
-from sklearn.linear_model import LinearRegression
+from inference import var_forecast, integrate, log_trans_array, predict_linear
+from fan_chart import simulate_fan, fan_traces
+from figures import line_trace, historical_traces
+from lag_selection import lag_order_criteria, choose_lag_order
+from origins import ORIGINS, origin_paths, load_origin_history, fit_pass_through, predict_origins
+from result_cache import ResultCache, deep_size
+from snapshot import read_csv_snapshot
+from timing import span
 from pathlib import Path
+import hashlib
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -31,197 +37,269 @@ def log_trans(df):
 
     return df_transformed
 
-# --- Generate forecast of China's and Japan's HRC prices ---
-def generate_forecast(iron_ore_up, hcc_up, scrap_up, export_perc_up, fai_up, iron_ore_down, hcc_down, scrap_down, export_perc_down, fai_down, selected_countries):
-    file_path = Path(__file__).resolve().parent.parent / "data" / "final" / "wo_na.csv"
-    df = pd.read_csv(file_path)
-    df.set_index('Date', inplace=True)
-    df.index = pd.to_datetime(df.index)
-    
+# --- Locate datasets used by the forecast ---
+DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "final"
+WO_NA_PATH = DATA_DIR / "wo_na.csv"
+HRC_CN_JP_PATH = DATA_DIR / "hrc_price_CN_JP.csv"
+
+# After feature selection in 03_regression_modelling.ipynb, these are the shortlisted variables. screening.shortlist is
+# not a derivation of this list: wo_na.csv already holds only these drivers, and the full candidate pool
+# (wo_na_all_cols.csv) screens to a different set.
+list_of_variables = ['Iron Ore (CFR, $/t)', 'HCC (Aus FOB, $/t)',
+    'Domestic Scrap (DDP Jiangsu incl. VAT $/t)',
+    'Monthly Export of Semis & Finished Steel as % of Production',
+    'FAI in urban real estate development (y-o-y) Growth',
+    'Automobile Production (y-o-y)', 'Civil Metal-Vessels/Steel Ships (y-o-y)',
+    'Household Fridges (y-o-y)', 'Air Conditioner (y-o-y)']
+hrc = ['HRC (FOB, $/t)']
+
+# Content hash of the datasets, re-hashed only when a file's size or mtime changes
+_fingerprint_cache = {}
+
+def dataset_fingerprint(paths=None):
+    if paths is None:
+        paths = list(dict.fromkeys([WO_NA_PATH, HRC_CN_JP_PATH] + origin_paths()))
+    stats = tuple((str(p), p.stat().st_mtime_ns, p.stat().st_size) for p in paths)
+    if stats not in _fingerprint_cache:
+        h = hashlib.sha256()
+        for p in paths:
+            h.update(Path(p).read_bytes())
+        _fingerprint_cache.clear()
+        _fingerprint_cache[stats] = h.hexdigest()
+    return _fingerprint_cache[stats]
+
+# --- Fitted models, built once per dataset version ---
+# Columns modelled by the VAR, with China's HRC price first
+final_cols = hrc + list_of_variables
+
+# Number of months forecast by the VAR
+forecast_steps = 17
+
+# VAR lag order: the order minimizing LAG_CRITERION ('aic', 'bic', 'hqic' or 'fpe') over 1..MAX_LAGS, or the order
+# chosen in 02_var.ipynb when LAG_CRITERION is None. The criteria of every order are kept with the fitted model.
+MAX_LAGS = 12
+LAG_CRITERION = None
+LAG_ORDER = 4
+
+# Lag order the forecast uses on df: the minimum of LAG_CRITERION, or LAG_ORDER when selection is off (the default).
+# Pass criteria when they are already computed. Every fit of the VAR goes through this, so that the backtest, the
+# incremental updates, the tournament and the benchmark follow the dashboard's order.
+def selected_lag_order(df, criteria=None):
+    if LAG_CRITERION is None:
+        return LAG_ORDER
+    if criteria is None:
+        criteria = lag_order_criteria(df[final_cols].diff().dropna().values, MAX_LAGS)
+    return choose_lag_order(criteria, LAG_CRITERION, LAG_ORDER)
+
+# Drivers with user-supplied upside/downside values; the remaining variables always use the VAR forecast
+scenario_drivers = list_of_variables[:5]
+
+# Short names of the scenario drivers, with the dashboard's default upside and downside values
+SCENARIO_INPUTS = ['iron_ore', 'hcc', 'scrap', 'export_perc', 'fai']
+DEFAULT_UPSIDE = {'iron_ore': 100, 'hcc': 220, 'scrap': 400, 'export_perc': 9, 'fai': 5}
+DEFAULT_DOWNSIDE = {'iron_ore': 85, 'hcc': 180, 'scrap': 350, 'export_perc': 12, 'fai': 1}
+
+class ForecastModel:
+    # params holds the fitted coefficients as plain arrays so that the model can be rebuilt from a saved artifact:
+    # var_coefs (k_ar x k x k), var_intercept (k), sigma_u (k x k), last_diff (k_ar x k),
+    # cn_coef, cn_intercept, log_shift (China regression on log-transformed X), origin_names, origin_coefs, origin_last_date,
+    # origin_last_price (pass-through of each registered origin from China, see origins.fit_pass_through),
+    # lag_criteria (AIC, BIC, FPE and HQIC of lag orders 0 to MAX_LAGS, as in lag_selection.CRITERIA; only kept when
+    # LAG_CRITERION selects the order)
+    def __init__(self, df, hrc_price_CN_JP, params, fingerprint=None):
+        self.fingerprint = fingerprint
+        self.df = df
+        self.hrc_price_CN_JP = hrc_price_CN_JP
+        self.params = params
+        self.k_ar = params['var_coefs'].shape[0]
+        self.steps = forecast_steps
+
+        # VAR forecast of the independent variables, with differencing inverted
+        var_levels = integrate(df.values[-1], var_forecast(params['var_coefs'], params['var_intercept'], params['last_diff'], self.steps))
+        fc_period = pd.date_range(start=df.index[-1] + pd.offsets.MonthBegin(1), periods=self.steps, freq='MS')
+        df_forecast_processed = pd.DataFrame(var_levels, index=fc_period, columns=[col + '_forecast' for col in final_cols])
+        df_forecast_processed.index.name = 'Date'
+        self.df_forecast_processed = df_forecast_processed
+
+        # Log transform VAR forecasted X variables and predict China's HRC price forecast
+        forecasted_X = var_levels[:, 1:]
+        y_forecast = self.predict_china(log_trans_array(forecasted_X))
+        y_forecast_new = np.insert(y_forecast, 0, df['HRC (FOB, $/t)'][-1])
+
+        self.forecast_period = pd.date_range(start=df.index[-1], periods=self.steps + 1, freq='MS')
+        final_forecast = pd.DataFrame(y_forecast_new, index=self.forecast_period, columns=['China HRC Forecast (FOB, $/t)'])
+        final_forecast.index.name = 'Date'
+        self.final_forecast = final_forecast
+
+        # Predict every origin's HRC prices from China's forecast, each after its last month with an actual price
+        self.origins = [str(name) for name in params['origin_names']]
+        self.origin_masks = self.forecast_period.values[None, :] > params['origin_last_date'][:, None]
+        origin_prices = predict_origins(y_forecast_new, params['origin_coefs'])
+        self.origin_forecasts = {}
+        for i, origin in enumerate(self.origins):
+            mask = self.origin_masks[i]
+            period = pd.date_range(start=params['origin_last_date'][i], periods=mask.sum() + 1, freq='MS', name='Date')
+            values = np.insert(origin_prices[mask, i], 0, params['origin_last_price'][i])
+            self.origin_forecasts[origin] = pd.DataFrame(values, index=period, columns=[f'{origin} HRC Forecast (FOB, $/t)'])
+
+        # Japan's forecast is the one shown by the dashboard
+        jp = self.origins.index('Japan')
+        self.jp_mask = self.origin_masks[jp]
+        self.df_forecast_JP = self.origin_forecasts['Japan']
+        self.fc_period_JP = self.df_forecast_JP.index
+        self.nobs = len(self.fc_period_JP)
+
+        # Precompute the part of the scenario forecasts that does not depend on the upside/downside drivers
+        n_drivers = len(scenario_drivers)
+        var_X_transformed = log_trans_array(forecasted_X[:, n_drivers:])
+        self.scenario_base = predict_linear(var_X_transformed, params['cn_coef'][n_drivers:], params['cn_intercept'])
+        self.cn_anchor = df['HRC (FOB, $/t)'][-1]
+        self.jp_anchor = params['origin_last_price'][jp]
+
+    # Apply the regression coefficients directly instead of going through sklearn's predict
+    def predict_china(self, X_transformed):
+        return predict_linear(np.asarray(X_transformed, dtype=float), self.params['cn_coef'], self.params['cn_intercept'])
+
+# Fit the VAR, China and origin models on the historical data and return their coefficients as arrays.
+# origin_histories holds the price histories of registered origins other than Japan, whose history is hrc_price_CN_JP.
+# lag_order has no default: pass selected_lag_order(df) unless a specific order is wanted.
+def fit_params(df, hrc_price_CN_JP, lag_order, origin_histories=None):
+    # Fitting libraries are only needed here, so the serving path does not import them
+    from statsmodels.tsa.api import VAR
+    from sklearn.linear_model import LinearRegression
+    warnings.filterwarnings("ignore")
+
     # --- Use a VAR model to forecast independent variables ---
-    # After feature selection, these are the shortlisted variables
-    list_of_variables = ['Iron Ore (CFR, $/t)', 'HCC (Aus FOB, $/t)',
-        'Domestic Scrap (DDP Jiangsu incl. VAT $/t)',
-        'Monthly Export of Semis & Finished Steel as % of Production',
-        'FAI in urban real estate development (y-o-y) Growth',
-        'Automobile Production (y-o-y)', 'Civil Metal-Vessels/Steel Ships (y-o-y)',
-        'Household Fridges (y-o-y)', 'Air Conditioner (y-o-y)']
-    hrc = ['HRC (FOB, $/t)']
-    final_cols = hrc + list_of_variables
     final_df = df.copy()
     final_df = final_df[final_cols]
 
     # Difference data to achieve stationarity
     final_df_differenced = final_df.diff().dropna()
 
-    # Determine the best number of lags
-    var_model = VAR(final_df_differenced)
-    x = var_model.select_order(maxlags=12)
-
     # Fit model with optimal lag
-    model_fitted = var_model.fit(4)
+    with span("var_fit"):
+        var_model = VAR(final_df_differenced)
+        model_fitted = var_model.fit(lag_order)
 
-    # Using the last 4 observations (since lag order is 4) to forecast the following periods
-    lag_order = model_fitted.k_ar
+    # Using the last lag_order observations to forecast the following periods
     forecast_input = final_df_differenced.values[-lag_order:]
 
-    # Forecast the following periods
-    fc = model_fitted.forecast(y=forecast_input, steps=17)
-    fc_period = pd.date_range(start='11/1/2024', periods=17, freq='MS')
-    df_forecast = pd.DataFrame(fc, index=fc_period, columns=final_df.columns + '_1d')
-    df_forecast.index.name = 'Date'
-
-    # Invert differencing of forecasted results
-    df_forecast_processed = invert_transformation(final_df, df_forecast)
-
 
     # --- Use a Multiple Linear Regression model to predict China's HRC prices ---
     # Define X and y variables
     X = df[list_of_variables]
     y = df['HRC (FOB, $/t)']
 
-    # Log transform X variables
-    X_transformed = log_trans(X)
-
-    # Model fitting
-    lr_model = LinearRegression()
-    lr_model.fit(X_transformed, y)
-
-    # Obtain VAR forecasted X variables
-    forecasted_X = df_forecast_processed[['Iron Ore (CFR, $/t)_forecast', 'HCC (Aus FOB, $/t)_forecast',
-         'Domestic Scrap (DDP Jiangsu incl. VAT $/t)_forecast',
-         'Monthly Export of Semis & Finished Steel as % of Production_forecast',
-         'FAI in urban real estate development (y-o-y) Growth_forecast',
-         'Automobile Production (y-o-y)_forecast', 'Civil Metal-Vessels/Steel Ships (y-o-y)_forecast',
-         'Household Fridges (y-o-y)_forecast', 'Air Conditioner (y-o-y)_forecast']].copy()
-    
-    # Log transform VAR forecasted X variables
-    forecasted_X.rename(columns={'Iron Ore (CFR, $/t)_forecast':'Iron Ore (CFR, $/t)', 'HCC (Aus FOB, $/t)_forecast':'HCC (Aus FOB, $/t)',
-         'Domestic Scrap (DDP Jiangsu incl. VAT $/t)_forecast':'Domestic Scrap (DDP Jiangsu incl. VAT $/t)',
-         'Monthly Export of Semis & Finished Steel as % of Production_forecast':'Monthly Export of Semis & Finished Steel as % of Production',
-         'FAI in urban real estate development (y-o-y) Growth_forecast':'FAI in urban real estate development (y-o-y) Growth',
-         'Automobile Production (y-o-y)_forecast':'Automobile Production (y-o-y)', 'Civil Metal-Vessels/Steel Ships (y-o-y)_forecast':'Civil Metal-Vessels/Steel Ships (y-o-y)',
-         'Household Fridges (y-o-y)_forecast':'Household Fridges (y-o-y)', 'Air Conditioner (y-o-y)_forecast':'Air Conditioner (y-o-y)'}, inplace=True)
-    forecasted_X_transformed = log_trans(forecasted_X)
-
-    # Predict China's HRC price forecast
-    y_forecast = lr_model.predict(forecasted_X_transformed)
-    y_forecast_new = np.insert(y_forecast, 0, df['HRC (FOB, $/t)'][-1])
-
-    forecast_period = pd.date_range(start=df.index[-1], periods=18, freq='MS')
-    final_forecast = pd.DataFrame(y_forecast_new, index=forecast_period, columns=['China HRC Forecast (FOB, $/t)'])
-    final_forecast.index.name = 'Date'
-
-    # Define code for forecasting China's upside and downside HRC prices
-    def forecast_china_upside_downside(iron_ore, hcc, scrap, export_perc, fai, var_forecast):
-          # Initialise df
-          fc_p = pd.date_range(start=var_forecast.index[0], end=var_forecast.index[-1], freq='MS')
-          up_down_df = pd.DataFrame(np.nan, index=fc_p, columns=['Iron Ore (CFR, $/t)',
-                                                                 'HCC (Aus FOB, $/t)',
-                                                                 'Domestic Scrap (DDP Jiangsu incl. VAT $/t)',
-                                                                 'Monthly Export of Semis & Finished Steel as % of Production',
-                                                                 'FAI in urban real estate development (y-o-y) Growth',
-                                                                 'Automobile Production (y-o-y)', 'Civil Metal-Vessels/Steel Ships (y-o-y)',
-                                                                 'Household Fridges (y-o-y)', 'Air Conditioner (y-o-y)'])
-          up_down_df.index.name = 'Date'
-
-          # Use upside/downside values for the following X variables
-          up_down_df['Iron Ore (CFR, $/t)'] = iron_ore
-          up_down_df['HCC (Aus FOB, $/t)'] = hcc
-          up_down_df['Domestic Scrap (DDP Jiangsu incl. VAT $/t)'] = scrap
-          up_down_df['Monthly Export of Semis & Finished Steel as % of Production'] = export_perc
-          up_down_df['FAI in urban real estate development (y-o-y) Growth'] = fai
-
-          # Use VAR forecasted values for the following X variables since upside/downside values are not available
-          up_down_df['Automobile Production (y-o-y)'] = var_forecast['Automobile Production (y-o-y)_forecast']
-          up_down_df['Civil Metal-Vessels/Steel Ships (y-o-y)'] = var_forecast['Civil Metal-Vessels/Steel Ships (y-o-y)_forecast']
-          up_down_df['Household Fridges (y-o-y)'] = var_forecast['Household Fridges (y-o-y)_forecast']
-          up_down_df['Air Conditioner (y-o-y)'] = var_forecast['Air Conditioner (y-o-y)_forecast']
-
-          # Log transform variables
-          up_down_transformed = log_trans(up_down_df)
-
-          # Predict China's upside/downside HRC prices
-          up_down_f = lr_model.predict(up_down_transformed)
-          up_down_f_new = np.insert(up_down_f, 0, df['HRC (FOB, $/t)'][-1])
-
-          fc_dates = pd.date_range(start=df.index[-1], periods=18, freq='MS')
-          up_down_forecast = pd.DataFrame(up_down_f_new, index=fc_dates, columns=['China HRC (FOB, $/t)'])
-          up_down_forecast.index.name = 'Date'
-          return up_down_forecast
-    
-    # Forecasting China's upside and downside HRC prices
-    CN_forecast_upside = forecast_china_upside_downside(iron_ore_up, hcc_up, scrap_up, export_perc_up, fai_up, df_forecast_processed)
-    CN_forecast_downside = forecast_china_upside_downside(iron_ore_down, hcc_down, scrap_down, export_perc_down, fai_down, df_forecast_processed)
-    
-
-    # --- Use a Simple Linear Regression model to predict Japan's HRC prices from China's HRC prices ---
-    # Read csv that contains China's and Japan's historical HRC prices
-    file_path_JP = Path(__file__).resolve().parent.parent / "data" / "final" / "hrc_price_CN_JP.csv"
-    hrc_price_CN_JP = pd.read_csv(file_path_JP)
-    hrc_price_CN_JP.dropna(inplace=True)
-    hrc_price_CN_JP.set_index('Date', inplace=True)
-    hrc_price_CN_JP.index = pd.to_datetime(hrc_price_CN_JP.index)
-    hrc_price_CN_JP = hrc_price_CN_JP[:-1]
-
-    # Prepare X and y columns
-    X_JP = hrc_price_CN_JP[["China HRC (FOB, $/t)"]]
-    y_JP = hrc_price_CN_JP["Japan HRC (FOB, $/t)"]
-
-    # Train the model
-    model_JP = LinearRegression()
-    model_JP_fitted = model_JP.fit(X_JP, y_JP)
-
-    # Obtain China's HRC prices that will be used for predictions
-    x_CN = final_forecast[['China HRC Forecast (FOB, $/t)']].loc[final_forecast.index > '2025-01-01'].copy()
-    nobs = len(x_CN) + 1
-    x_CN.rename(columns={'China HRC Forecast (FOB, $/t)':'China HRC (FOB, $/t)'}, inplace=True)
-    
-    # Predict Japan's HRC prices
-    y_JP_forecast = model_JP_fitted.predict(x_CN)
-    y_JP_forecast_new = np.insert(y_JP_forecast, 0, hrc_price_CN_JP['Japan HRC (FOB, $/t)'].loc['2025-01-01'])
-    fc_period_JP = pd.date_range(start='2025-01-01', periods=nobs, freq='MS')
-    df_forecast_JP = pd.DataFrame(y_JP_forecast_new, index=fc_period_JP, columns=['Japan HRC Forecast (FOB, $/t)'])
-    df_forecast_JP.index.name = 'Date'
-
-    # Define code for forecasting Japan's upside and downside HRC prices
-    def forecast_japan_upside_downside(CN_upside_downside):
-          # Obtain China's upside/downside forecast and filter for Japan's forecast period
-          china_forecast = CN_upside_downside[['China HRC (FOB, $/t)']].loc[CN_upside_downside.index > '2025-01-01'].copy()
-
-          # Predict Japan's upside/downside HRC prices
-          japan_forecast = model_JP_fitted.predict(china_forecast)
-          japan_forecast_new = np.insert(japan_forecast, 0, hrc_price_CN_JP['Japan HRC (FOB, $/t)'].loc['2025-01-01'])
-          fc_dates_JP = pd.date_range(start='2025-01-01', periods=nobs, freq='MS')
-          JP_up_down_forecast = pd.DataFrame(japan_forecast_new, index=fc_dates_JP, columns=['Japan HRC (FOB, $/t)'])
-          JP_up_down_forecast.index.name = 'Date'
-
-          return JP_up_down_forecast
-
-    # Forecasting Japan's upside and downside HRC prices
-    JP_forecast_downside = forecast_japan_upside_downside(CN_forecast_downside)
-    JP_forecast_upside = forecast_japan_upside_downside(CN_forecast_upside)
-
-
-    # --- Plot graph ---
-    fig = go.Figure()
-    if "China" in selected_countries:
-        fig.add_trace(go.Scatter(x=df.index, y=df["HRC (FOB, $/t)"], mode='lines', name="China's historical HRC", line=dict(color='black', dash='solid')))
-        fig.add_trace(go.Scatter(x=final_forecast.index, y=final_forecast["China HRC Forecast (FOB, $/t)"], mode='lines', name="China's forecasted HRC", line=dict(color='red', dash='solid')))
-        fig.add_trace(go.Scatter(x=forecast_period, y=CN_forecast_upside['China HRC (FOB, $/t)'], mode='lines', line=dict(width=0), name="Range China", showlegend=False))
-        fig.add_trace(go.Scatter(x=forecast_period, y=CN_forecast_downside['China HRC (FOB, $/t)'], mode='lines', fill='tonexty', fillcolor='rgba(240, 128, 128, 0.2)',line=dict(width=0), name="Range China", showlegend=True))
-    
-    if "Japan" in selected_countries:
-        japan_historical = hrc_price_CN_JP[['Japan HRC (FOB, $/t)']].loc[hrc_price_CN_JP.index > '2006-08-01'].copy()
-        fig.add_trace(go.Scatter(x=japan_historical.index, y=japan_historical["Japan HRC (FOB, $/t)"], mode='lines', name="Japan's historical HRC", line=dict(color='slategray', dash='solid')))
-        fig.add_trace(go.Scatter(x=df_forecast_JP.index, y=df_forecast_JP["Japan HRC Forecast (FOB, $/t)"], mode='lines', name="Japan's forecasted HRC", line=dict(color='teal', dash='solid')))
-        fig.add_trace(go.Scatter(x=fc_period_JP, y=JP_forecast_upside['Japan HRC (FOB, $/t)'], mode='lines', line=dict(width=0), name="Range Japan", showlegend=False))
-        fig.add_trace(go.Scatter(x=fc_period_JP, y=JP_forecast_downside['Japan HRC (FOB, $/t)'], mode='lines', fill='tonexty', fillcolor='rgba(152, 251, 152, 0.2)',line=dict(width=0), name="Range Japan", showlegend=True))
-
-    fig.update_layout(title="Forecasting China's and Japan's HRC prices", xaxis_title='Date', yaxis_title='HRC (FOB, $/t)')
-
-    # --- Combine China's and Japan's forecasted HRC prices into a df ---
-    CN_JP_forecast = pd.merge(final_forecast, df_forecast_JP, on='Date', how='outer')
+    # Log transform X variables and fit the model
+    with span("china_regression"):
+        X_transformed = log_trans(X)
+        lr_model = LinearRegression()
+        lr_model.fit(X_transformed, y)
+
+    # Constants added before the log transform of the training X variables
+    log_shift = np.where(X.min() < 0, X.min().abs() + 1, 0.0)
+
+
+    # --- Use Simple Linear Regression models to predict Japan's and the other origins' HRC prices from China's ---
+    with span("origin_regression"):
+        origin_params = fit_pass_through({'Japan': hrc_price_CN_JP, **(origin_histories or {})})
+
+    params = {
+        'var_coefs': model_fitted.coefs,
+        'var_intercept': model_fitted.intercept,
+        'sigma_u': np.asarray(model_fitted.sigma_u),
+        'last_diff': forecast_input,
+        'cn_coef': lr_model.coef_,
+        'cn_intercept': np.float64(lr_model.intercept_),
+        'log_shift': log_shift,
+        **origin_params,
+    }
+    return params
+
+def fit_forecast_model(df, hrc_price_CN_JP, fingerprint=None, origin_histories=None):
+    # Price histories of the registered origins other than Japan
+    if origin_histories is None:
+        origin_histories = {name: load_origin_history(name) for name in ORIGINS if name != 'Japan'}
+
+    # Determine the number of lags: the criteria are only computed when LAG_CRITERION selects the order
+    final_df = df[final_cols]
+    lag_criteria = None
+    with span("lag_selection"):
+        if LAG_CRITERION is not None:
+            lag_criteria = lag_order_criteria(final_df.diff().dropna().values, MAX_LAGS)
+        lag_order = selected_lag_order(final_df, lag_criteria)
+
+    # Fit model with the selected lag order
+    params = fit_params(df, hrc_price_CN_JP, lag_order=lag_order, origin_histories=origin_histories)
+    if lag_criteria is not None:
+        params['lag_criteria'] = lag_criteria.values
+    with span("model_build"):
+        return ForecastModel(final_df, hrc_price_CN_JP, params, fingerprint)
+
+# Read csvs containing the model inputs and China's and Japan's historical HRC prices
+def load_data():
+    with span("csv_load"):
+        df = read_csv_snapshot(WO_NA_PATH)
+
+        hrc_price_CN_JP = read_csv_snapshot(HRC_CN_JP_PATH)
+        hrc_price_CN_JP = hrc_price_CN_JP.dropna()
+        hrc_price_CN_JP = hrc_price_CN_JP[:-1]
+    return df, hrc_price_CN_JP
+
+# Fitted models keyed by dataset fingerprint, so reruns only refit when the data changes
+_model_cache = {}
+
+def get_fitted_model():
+    with span("fingerprint"):
+        fingerprint = dataset_fingerprint()
+    if fingerprint not in _model_cache:
+        # Use the artifact written by `python model_store.py` if there is one, otherwise fit from the csvs
+        from model_store import load_model
+        with span("artifact_load"):
+            model = load_model(fingerprint)
+        if model is None:
+            df, hrc_price_CN_JP = load_data()
+            model = fit_forecast_model(df, hrc_price_CN_JP, fingerprint)
+        _model_cache.clear()
+        _model_cache[fingerprint] = model
+    return _model_cache[fingerprint]
+
+# --- Batch scenario engine ---
+# Every origin's HRC paths for China paths on model.forecast_period (n_paths x 18), from one stacked product.
+# Returns {origin: paths}, each starting from the origin's last actual price, on model.origin_forecasts[origin].index.
+def forecast_origins(model, china):
+    prices = predict_origins(china, model.params['origin_coefs'])
+    paths = {}
+    for i, origin in enumerate(model.origins):
+        mask = model.origin_masks[i]
+        paths[origin] = np.empty((china.shape[0], mask.sum() + 1))
+        paths[origin][:, 0] = model.params['origin_last_price'][i]
+        paths[origin][:, 1:] = prices[:, mask, i]
+    return paths
+
+# log_trans shifts a column with negative values by |min| + 1, so a constant negative driver becomes log(1) = 0
+def _log_drivers(drivers):
+    drivers = np.asarray(drivers, dtype=float)
+    return np.log(np.where(drivers < 0, 1.0, drivers))
+
+# drivers is an (n_scenarios x 5) array of iron ore, HCC, scrap, export % and FAI values held flat over the forecast horizon.
+# Returns China's (n_scenarios x 18) and Japan's (n_scenarios x 15) HRC paths, each starting from the last actual price,
+# on model.forecast_period and model.fc_period_JP respectively.
+def forecast_scenarios(model, drivers):
+    drivers = np.atleast_2d(np.asarray(drivers, dtype=float))
+    n_drivers = len(scenario_drivers)
+
+    # Predict China's HRC prices: one driver term per scenario plus the shared VAR-driven term per month
+    china = np.empty((drivers.shape[0], len(model.forecast_period)))
+    china[:, 0] = model.cn_anchor
+    china[:, 1:] = (_log_drivers(drivers) @ model.params['cn_coef'][:n_drivers])[:, None] + model.scenario_base[None, :]
+
+    # Predict Japan's HRC prices from China's
+    return china, forecast_origins(model, china)['Japan']
+
+# --- Combine China's and Japan's forecasted HRC prices into a df ---
+def forecast_table(model):
+    CN_JP_forecast = pd.merge(model.final_forecast, model.df_forecast_JP, on='Date', how='outer')
     CN_JP_forecast.index.name = 'Month'
 
     # Filter for forecasts starting from Apr 2025
@@ -229,7 +307,80 @@ def generate_forecast(iron_ore_up, hcc_up, scrap_up, export_perc_up, fai_up, iro
 
     # Format Month column to MMM-YY
     CN_JP_forecast.index = CN_JP_forecast.index.strftime('%b-%y')
+    return CN_JP_forecast
+
+# --- Evaluate upside and downside scenarios on the fitted models ---
+def evaluate_scenario(model, iron_ore_up, hcc_up, scrap_up, export_perc_up, fai_up, iron_ore_down, hcc_down, scrap_down, export_perc_down, fai_down, selected_countries, fan_chart=False, n_paths=5000):
+    final_forecast = model.final_forecast
+    forecast_period = model.forecast_period
+    df_forecast_JP = model.df_forecast_JP
+    fc_period_JP = model.fc_period_JP
+
+    # Forecasting China's and Japan's upside and downside HRC prices in one batch
+    drivers_up = [iron_ore_up, hcc_up, scrap_up, export_perc_up, fai_up]
+    drivers_down = [iron_ore_down, hcc_down, scrap_down, export_perc_down, fai_down]
+    with span("scenario_predict"):
+        china_up_down, japan_up_down = forecast_scenarios(model, [drivers_up, drivers_down])
+
+    # Simulate forecast paths from the VAR residual covariance for the fan chart (fixed seed so reruns are stable)
+    if fan_chart:
+        with span("fan_chart"):
+            china_bands, japan_bands, outside = simulate_fan(model, n_paths=n_paths, seed=0)
+            fan_note = f"up to {outside.max():.0%} of paths floored" if outside.max() > 0 else None
+
+    # --- Plot graph ---
+    # The historical traces are cached per fitted model; only the forecast and band traces are rebuilt on each rerun
+    with span("figure_build"):
+        history = historical_traces(model)
+        traces = []
+        if "China" in selected_countries:
+            traces.append(history["China"])
+            traces.append(line_trace(final_forecast.index, final_forecast["China HRC Forecast (FOB, $/t)"], mode='lines', name="China's forecasted HRC", line=dict(color='red', dash='solid')))
+            traces.append(line_trace(forecast_period, china_up_down[0], mode='lines', line=dict(width=0), name="Range China", showlegend=False))
+            traces.append(line_trace(forecast_period, china_up_down[1], mode='lines', fill='tonexty', fillcolor='rgba(240, 128, 128, 0.2)',line=dict(width=0), name="Range China", showlegend=True))
+            if fan_chart:
+                traces += fan_traces(forecast_period, china_bands, "China", '205, 92, 92', fan_note)
+
+        if "Japan" in selected_countries:
+            traces.append(history["Japan"])
+            traces.append(line_trace(df_forecast_JP.index, df_forecast_JP["Japan HRC Forecast (FOB, $/t)"], mode='lines', name="Japan's forecasted HRC", line=dict(color='teal', dash='solid')))
+            traces.append(line_trace(fc_period_JP, japan_up_down[0], mode='lines', line=dict(width=0), name="Range Japan", showlegend=False))
+            traces.append(line_trace(fc_period_JP, japan_up_down[1], mode='lines', fill='tonexty', fillcolor='rgba(152, 251, 152, 0.2)',line=dict(width=0), name="Range Japan", showlegend=True))
+            if fan_chart:
+                traces += fan_traces(fc_period_JP, japan_bands, "Japan", '46, 139, 87', fan_note)
+
+        # Plotly is only imported once a figure is actually built
+        import plotly.graph_objects as go
+        fig = go.Figure(data=traces)
+        fig.update_layout(title="Forecasting China's and Japan's HRC prices", xaxis_title='Date', yaxis_title='HRC (FOB, $/t)')
+
+    with span("forecast_table"):
+        CN_JP_forecast = forecast_table(model)
 
     return fig, CN_JP_forecast
 
 
+# --- Cache of scenario results shared by all sessions ---
+# Keyed by the dataset fingerprint and the scenario inputs, with driver values rounded so that float noise from the
+# widgets does not split entries. The cached figure and forecast table are shared and must not be modified.
+ROUND_DIGITS = 6
+result_cache = ResultCache()
+
+def scenario_key(model, drivers, selected_countries, fan_chart, n_paths):
+    return (model.fingerprint, tuple(round(float(v), ROUND_DIGITS) for v in drivers), tuple(selected_countries),
+            bool(fan_chart), int(n_paths) if fan_chart else None)
+
+# Estimated bytes of a (figure, forecast table) result: everything the figure's traces and layout hold, plus the table.
+# Within about 15% of the memory tracemalloc attributes to a result.
+def result_size(result):
+    fig, CN_JP_forecast = result
+    return deep_size(fig.to_plotly_json()) + int(CN_JP_forecast.memory_usage(index=True, deep=True).sum())
+
+# --- Generate forecast of China's and Japan's HRC prices ---
+def generate_forecast(iron_ore_up, hcc_up, scrap_up, export_perc_up, fai_up, iron_ore_down, hcc_down, scrap_down, export_perc_down, fai_down, selected_countries, fan_chart=False, n_paths=5000):
+    model = get_fitted_model()
+    drivers = [iron_ore_up, hcc_up, scrap_up, export_perc_up, fai_up, iron_ore_down, hcc_down, scrap_down, export_perc_down, fai_down]
+    return result_cache.get_or_compute(
+        scenario_key(model, drivers, selected_countries, fan_chart, n_paths),
+        lambda: evaluate_scenario(model, *drivers, selected_countries, fan_chart, n_paths),
+        result_size)
@@ -0,0 +1,105 @@
+# --- Import libraries ---
+import numpy as np
+from inference import var_forecast, integrate, predict_linear, log_shifted, outside_log_range
+from origins import predict_origins
+from figures import line_trace
+
+# --- Monte Carlo fan chart driven by the VAR residual covariance ---
+# Simulated driver paths are log-transformed with the training data's shifts (params['log_shift']), the transform China's
+# regression was fitted with, so the transform is the same for every path and month. Path values below that fitted
+# range are floored at log(1) = 0 (inference.log_shifted), and the share of paths floored at each horizon is returned so
+# the chart can say so: the lower tail at long horizons depends on that floor, as many paths leave the fitted range. The dashboard's point forecast, as in the notebooks, log-transforms the VAR forecast with its own
+# shifts instead, which sits about 90 $/t below the fitted transform's deterministic path. Each simulated China path is
+# therefore placed on the point forecast by its deviation from that deterministic path: the bands show the spread of the
+# fitted model around the forecast on the chart.
+PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_CHUNK_SIZE = 20000
+
+# China's prices for X paths (..., steps, k) under the fitted log transform, with the values it floors
+def predict_paths(model, X):
+    params = model.params
+    shift = params['log_shift']
+    china = predict_linear(log_shifted(X, shift), params['cn_coef'], params['cn_intercept'])
+    return china, outside_log_range(X, shift).any(axis=-1)
+
+# Simulate one chunk of VAR forecast paths and push them through the China and Japan regressions.
+# All paths are simulated together; the only Python loop is over the forecast horizon (in inference.var_forecast).
+# Returns China's and Japan's price paths and, per path and month, whether any driver was floored.
+def simulate_chunk(model, n_paths, rng, dtype=np.float32):
+    params = model.params
+    k = params['var_coefs'].shape[1]
+
+    # Draw correlated VAR innovations from the fitted residual covariance
+    chol = np.linalg.cholesky(np.asarray(params['sigma_u'], dtype=float)).astype(dtype)
+    shocks = rng.standard_normal((n_paths, model.steps, k), dtype=dtype) @ chol.T
+
+    # Forecast all paths together and invert differencing for all paths at once
+    last_diff = np.broadcast_to(np.asarray(params['last_diff'], dtype=dtype), (n_paths,) + params['last_diff'].shape)
+    diffs = var_forecast(params['var_coefs'], params['var_intercept'], last_diff, model.steps, shocks=shocks)
+    levels = integrate(model.df.values[-1].astype(dtype), diffs)
+
+    # China's HRC prices as deviations from the deterministic path, placed on the point forecast, then Japan's from China's
+    china, outside = predict_paths(model, levels[:, :, 1:])
+    deterministic, _ = predict_paths(model, model.df_forecast_processed.values[:, 1:])
+    china = china - deterministic.astype(dtype) + model.final_forecast.values[1:, 0].astype(dtype)
+    japan = predict_origins(china[:, model.jp_mask[1:]], params['origin_coefs'][:, [model.origins.index('Japan')]])[..., 0]
+    return china, japan, outside
+
+# Simulate n_paths forecast paths in chunks of at most chunk_size paths, so the VAR buffers stay bounded
+# and only the China and Japan price paths are kept. Returns the percentile bands of both, each starting
+# from the last actual price: china_bands is (len(percentiles) x 18) and japan_bands is (len(percentiles) x 15),
+# and the share of paths with a floored driver at each of the 17 forecast months.
+def simulate_fan(model, n_paths=5000, chunk_size=DEFAULT_CHUNK_SIZE, percentiles=PERCENTILES, seed=None):
+    rng = np.random.default_rng(seed)
+    china = np.empty((n_paths, model.steps), dtype=np.float32)
+    japan = np.empty((n_paths, model.nobs - 1), dtype=np.float32)
+    n_outside = np.zeros(model.steps)
+    for start in range(0, n_paths, chunk_size):
+        stop = min(start + chunk_size, n_paths)
+        china[start:stop], japan[start:stop], outside = simulate_chunk(model, stop - start, rng)
+        n_outside += outside.sum(axis=0)
+
+    china_bands = np.percentile(china, percentiles, axis=0)
+    japan_bands = np.percentile(japan, percentiles, axis=0)
+    china_bands = np.column_stack([np.full(len(percentiles), model.cn_anchor), china_bands])
+    japan_bands = np.column_stack([np.full(len(percentiles), model.jp_anchor), japan_bands])
+    return china_bands, japan_bands, n_outside / n_paths
+
+# Traces of the 5-95 and 25-75 percentile bands and the median path of one country
+# (note, e.g. the share of floored paths, is added to the legend entry of the 5-95% band)
+def fan_traces(dates, bands, country, rgb, note=None):
+    p5, p25, p50, p75, p95 = bands
+    outer = f"{country} 5-95%" + (f" ({note})" if note else "")
+    return [
+        line_trace(dates, p95, mode='lines', line=dict(width=0), name=outer, showlegend=False),
+        line_trace(dates, p5, mode='lines', fill='tonexty', fillcolor=f'rgba({rgb}, 0.15)', line=dict(width=0), name=outer),
+        line_trace(dates, p75, mode='lines', line=dict(width=0), name=f"{country} 25-75%", showlegend=False),
+        line_trace(dates, p25, mode='lines', fill='tonexty', fillcolor=f'rgba({rgb}, 0.3)', line=dict(width=0), name=f"{country} 25-75%"),
+        line_trace(dates, p50, mode='lines', line=dict(color=f'rgb({rgb})', dash='dot'), name=f"{country} simulated median"),
+    ]
+
+
+# --- Check that the bands sit around the point forecast ---
+if __name__ == "__main__":
+    from china_japan import get_fitted_model
+
+    model = get_fitted_model()
+
+    # A shock in the last month leaves China's prices of the earlier months unchanged
+    X = np.repeat(model.df_forecast_processed.values[None, :, 1:], 2, axis=0)
+    X[1, -1] -= 100
+    china, _ = predict_paths(model, X)
+    local = np.allclose(china[0, :-1], china[1, :-1], rtol=1e-12, atol=0)
+
+    # The simulated median stays within a quarter of the interquartile range of the point forecast at every horizon
+    china_bands, japan_bands, outside = simulate_fan(model, n_paths=50000, seed=1)
+    offsets = {
+        'China': (china_bands[2] - model.final_forecast.values[:, 0])[1:] / (china_bands[3] - china_bands[1])[1:],
+        'Japan': (japan_bands[2] - model.df_forecast_JP.values[:, 0])[1:] / (japan_bands[3] - japan_bands[1])[1:],
+    }
+    print(f"Later shocks leave earlier months unchanged: {local}")
+    for country, offset in offsets.items():
+        print(f"{country}: median offset from the point forecast at most {np.abs(offset).max():.2f} interquartile ranges")
+    print(f"Paths with a driver outside the fitted range: {outside.min():.1%} to {outside.max():.1%} by horizon")
+    print(f"China 5th percentile at month {model.steps}: {china_bands[0, -1]:.1f} $/t")
+    assert local and max(np.abs(offset).max() for offset in offsets.values()) < 0.25
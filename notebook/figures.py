@@ -0,0 +1,63 @@
+# --- Import libraries ---
+import numpy as np
+import weakref
+
+# --- Lean traces for the forecast chart ---
+# The historical series do not change between reruns, so their traces are built once per fitted model and reused.
+# Traces are plain dicts with dates as ISO strings: plotly deep-copies every trace added to a figure, and copying
+# strings is much cheaper than copying arrays of datetime objects. Long series are downsampled with LTTB and drawn
+# with WebGL.
+WEBGL_MIN_POINTS = 1000
+MAX_HISTORY_POINTS = 2000
+
+# Largest-Triangle-Three-Buckets downsampling: returns the indices of n_out points that keep the visual shape of the
+# line (first and last points included). x must be increasing.
+def lttb(x, y, n_out):
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    idx = np.empty(n_out, dtype=int)
+    idx[0], idx[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i + 2 < len(edges):
+            avg_x, avg_y = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            avg_x, avg_y = x[-1], y[-1]
+        # Keep the point forming the largest triangle with the previously kept point and the next bucket's average
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(np.argmax(area))
+        idx[i + 1] = a
+    return idx
+
+def _date_strings(dates):
+    values = np.asarray(dates, dtype='datetime64[ns]')
+    unit = 'D' if np.all(values == values.astype('datetime64[D]')) else 's'
+    return np.datetime_as_string(values, unit=unit)
+
+# Line trace as a dict, downsampled to max_points and switched to WebGL when it is long
+def line_trace(dates, values, max_points=None, **kwargs):
+    dates, values = np.asarray(dates, dtype='datetime64[ns]'), np.asarray(values, dtype=float)
+    if max_points is not None and len(values) > max_points:
+        idx = lttb(dates.astype(np.int64), values, max_points)
+        dates, values = dates[idx], values[idx]
+    trace_type = 'scattergl' if len(values) >= WEBGL_MIN_POINTS else 'scatter'
+    return dict(type=trace_type, x=_date_strings(dates), y=values, **kwargs)
+
+# Historical traces of China and Japan, built once per fitted model
+_history_traces = weakref.WeakKeyDictionary()
+
+def historical_traces(model):
+    if model not in _history_traces:
+        df = model.df
+        japan_historical = model.hrc_price_CN_JP['Japan HRC (FOB, $/t)'].loc[model.hrc_price_CN_JP.index > '2006-08-01']
+        _history_traces[model] = {
+            "China": line_trace(df.index, df["HRC (FOB, $/t)"], MAX_HISTORY_POINTS, mode='lines', name="China's historical HRC", line=dict(color='black', dash='solid')),
+            "Japan": line_trace(japan_historical.index, japan_historical, MAX_HISTORY_POINTS, mode='lines', name="Japan's historical HRC", line=dict(color='slategray', dash='solid')),
+        }
+    return _history_traces[model]
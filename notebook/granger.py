@@ -0,0 +1,143 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+import argparse
+import hashlib
+import os
+import time
+from json_cache import JsonCache, use_pool
+
+# --- Pairwise Granger-causality tests between all columns ---
+# For every ordered pair of columns (cause, effect) and every lag, the p-value of the SSR F-test that the lags of cause
+# improve a regression of effect on its own lags (the ssr_ftest of statsmodels' grangercausalitytests). The k(k-1)
+# pairs are independent tasks spread across a process pool; the differenced data is placed once in shared memory and
+# workers read it from there instead of receiving a copy per task. Results are cached by a hash of the pair's values
+# and the lag, in memory and in data/cache/granger.json, so only pairs with new or changed columns are tested again.
+CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cache" / "granger.json"
+MAX_LAG = 12
+SIGNIFICANCE = 0.05
+TARGET = 'HRC (FOB, $/t)'
+
+# Fewest untested pairs run across a process pool (see json_cache.use_pool)
+MIN_PARALLEL_TASKS = 64
+
+_cache = JsonCache(CACHE_PATH)
+
+def _pair_hash(data, cause, effect):
+    h = hashlib.sha256(np.ascontiguousarray(data[:, effect]).tobytes())
+    h.update(np.ascontiguousarray(data[:, cause]).tobytes())
+    return h.hexdigest()
+
+# p-values of cause -> effect for each lag, from the same regressions as grangercausalitytests
+def granger_pvalues(effect, cause, lags):
+    from scipy.stats import f
+
+    n = len(effect)
+    pvalues = []
+    for lag in lags:
+        nobs = n - lag
+        y = effect[lag:]
+        own = np.column_stack([np.ones(nobs)] + [effect[lag - i:n - i] for i in range(1, lag + 1)])
+        joint = np.column_stack([own] + [cause[lag - i:n - i] for i in range(1, lag + 1)])
+        ssr_own = np.sum((y - own @ np.linalg.lstsq(own, y, rcond=None)[0]) ** 2)
+        ssr_joint = np.sum((y - joint @ np.linalg.lstsq(joint, y, rcond=None)[0]) ** 2)
+        df_resid = nobs - joint.shape[1]
+        if df_resid <= 0 or ssr_joint <= 0:
+            pvalues.append(float('nan'))
+            continue
+        stat = (ssr_own - ssr_joint) / ssr_joint / lag * df_resid
+        pvalues.append(float(f.sf(stat, lag, df_resid)))
+    return pvalues
+
+# Differenced data of the current pool, attached from shared memory by _init_worker
+_worker = {}
+
+def _init_worker(name, shape):
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['data'] = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+
+def _run_pair(task):
+    cause, effect, lags = task
+    data = _worker['data']
+    return granger_pvalues(data[:, effect], data[:, cause], lags)
+
+def _run_tasks(data, tasks, workers):
+    if not use_pool(len(tasks), workers, MIN_PARALLEL_TASKS):
+        _worker['data'] = data
+        try:
+            return [_run_pair(task) for task in tasks]
+        finally:
+            _worker.clear()
+
+    shm = shared_memory.SharedMemory(create=True, size=data.nbytes)
+    try:
+        np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(shm.name, data.shape)) as pool:
+            return list(pool.map(_run_pair, tasks, chunksize=max(len(tasks) // (4 * workers), 1)))
+    finally:
+        shm.close()
+        shm.unlink()
+
+# Granger-causality p-values of every ordered pair of columns for lags 1 to max_lag, computed on the first differences.
+# Returns a DataFrame indexed by (Lag, Cause) with one column per Effect, so granger_matrix(df).loc[4] is the k x k
+# matrix at lag 4. The diagonal is NaN.
+def granger_matrix(df, max_lag=MAX_LAG, workers=None):
+    df = df.select_dtypes('number').diff().dropna()
+    data = np.ascontiguousarray(df.values, dtype=np.float64)
+    k = data.shape[1]
+    lags = list(range(1, max_lag + 1))
+
+    _cache.load()
+    pairs = [(cause, effect) for cause in range(k) for effect in range(k) if cause != effect]
+    hashes = {pair: _pair_hash(data, *pair) for pair in pairs}
+    tasks = []
+    for cause, effect in pairs:
+        missing = [lag for lag in lags if f"{hashes[cause, effect]}:{lag}" not in _cache]
+        if missing:
+            tasks.append((cause, effect, missing))
+
+    if tasks:
+        results = _run_tasks(data, tasks, workers or os.cpu_count())
+        for (cause, effect, missing), pvalues in zip(tasks, results):
+            _cache.update({f"{hashes[cause, effect]}:{lag}": p for lag, p in zip(missing, pvalues)})
+        _cache.save()
+
+    pvalues = np.full((max_lag, k, k), np.nan)
+    for cause, effect in pairs:
+        pvalues[:, cause, effect] = [_cache[f"{hashes[cause, effect]}:{lag}"] for lag in lags]
+    index = pd.MultiIndex.from_product([lags, df.columns], names=['Lag', 'Cause'])
+    return pd.DataFrame(pvalues.reshape(max_lag * k, k), index=index, columns=pd.Index(df.columns, name='Effect'))
+
+# p-values of every column Granger-causing the target, one column per lag
+def causes_of(matrix, target=TARGET):
+    return matrix[target].unstack('Lag').drop(index=target)
+
+
+if __name__ == "__main__":
+    from snapshot import read_csv_snapshot
+
+    parser = argparse.ArgumentParser(description="Granger-causality p-values of every pair of columns at lags 1 to max-lag")
+    parser.add_argument("csv", nargs="?", default=str(Path(__file__).resolve().parent.parent / "data" / "final" / "wo_na_all_cols.csv"))
+    parser.add_argument("--max-lag", type=int, default=MAX_LAG, help="highest lag to test")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="write the full p-value matrix to this csv")
+    args = parser.parse_args()
+
+    df = read_csv_snapshot(args.csv)
+    start = time.perf_counter()
+    matrix = granger_matrix(df, args.max_lag, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.output:
+        matrix.to_csv(args.output)
+    if TARGET in matrix.columns:
+        print(f"p-values of each column Granger-causing {TARGET}:")
+        print(causes_of(matrix).round(4).to_string(), end="\n\n")
+    k = matrix.shape[1]
+    n_significant = int((matrix.values < SIGNIFICANCE).sum())
+    print(f"{n_significant} of {args.max_lag * k * (k - 1)} tests significant at {SIGNIFICANCE}")
+    print(f"Tested {k * (k - 1)} pairs at {args.max_lag} lags in {elapsed:.2f}s")
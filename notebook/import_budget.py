@@ -0,0 +1,52 @@
+# --- Import libraries ---
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# --- Import-time budget for the dashboard modules ---
+# Each module is imported in a fresh interpreter, so the measurement matches a cold Streamlit worker start.
+# The check fails if the fastest of several imports exceeds the budget, or if a heavy dependency that should
+# only be loaded when fitting or plotting is imported at module load.
+DEFAULT_BUDGET = 1.0
+MODULES = ['china_japan', 'landed_price', 'model_store']
+HEAVY_MODULES = ['statsmodels', 'sklearn', 'scipy', 'plotly.graph_objs', 'streamlit']
+
+_MEASURE = """
+import sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+# Import a module in a fresh interpreter and return the import time and the heavy modules it loaded
+def measure_import(module, repeats=5):
+    times, heavy = [], []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, "-c", _MEASURE.format(module=module, heavy=HEAVY_MODULES)],
+                                cwd=Path(__file__).resolve().parent, capture_output=True, text=True, check=True)
+        record = json.loads(result.stdout.strip().splitlines()[-1])
+        times.append(record["seconds"])
+        heavy = record["heavy"]
+    return min(times), heavy
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if importing the dashboard modules exceeds the import-time budget")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="maximum import time in seconds")
+    parser.add_argument("--repeats", type=int, default=5, help="number of fresh-interpreter imports per module")
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        seconds, heavy = measure_import(module, args.repeats)
+        ok = seconds <= args.budget and not heavy
+        failed = failed or not ok
+        print(f"{'ok  ' if ok else 'FAIL'} import {module}: {seconds:.3f}s (budget {args.budget:.3f}s)"
+              + (f", loads {', '.join(heavy)}" if heavy else ""))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
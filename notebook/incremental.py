@@ -0,0 +1,155 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from china_japan import ForecastModel, final_cols, list_of_variables, selected_lag_order
+
+# --- Incremental model updates when a new month of data lands ---
+# The VAR and both regressions are least-squares fits, so they are fully described by the sufficient statistics
+# Z'Z, Z'Y and Y'Y of their design matrices. A new month adds one row to each design, i.e. a rank-one update of
+# these statistics, after which the coefficients are re-solved from small normal equations without touching the history.
+
+# Sufficient statistics of a least-squares fit with an intercept
+class LeastSquaresStats:
+    def __init__(self, Z, Y):
+        Z = np.column_stack([np.ones(len(Z)), Z])
+        Y = np.asarray(Y, dtype=float).reshape(len(Z), -1)
+        self.ZtZ = Z.T @ Z
+        self.ZtY = Z.T @ Y
+        self.YtY = Y.T @ Y
+        self.nobs = len(Z)
+
+    # Rank-one update with a new observation
+    def add(self, z, y):
+        z = np.concatenate([[1.0], np.asarray(z, dtype=float)])
+        y = np.atleast_1d(np.asarray(y, dtype=float))
+        self.ZtZ += np.outer(z, z)
+        self.ZtY += np.outer(z, y)
+        self.YtY += np.outer(y, y)
+        self.nobs += 1
+
+    # Coefficients with the intercept in the first row
+    def solve(self):
+        return np.linalg.solve(self.ZtZ, self.ZtY)
+
+    # Residual covariance with the same degrees of freedom correction as statsmodels' VAR sigma_u
+    def residual_cov(self, B):
+        return (self.YtY - B.T @ self.ZtY) / (self.nobs - self.ZtZ.shape[0])
+
+class IncrementalModel:
+    def __init__(self, df, hrc_price_CN_JP, lag_order=None):
+        self.df = df[final_cols].copy()
+        self.hrc_price_CN_JP = hrc_price_CN_JP.copy()
+        self.lag_order = lag_order = selected_lag_order(self.df) if lag_order is None else lag_order
+
+        # New months are kept as plain arrays until a DataFrame is needed, so an update never copies the history
+        self.tail = self.df.values[-lag_order - 1:].copy()
+        self.new_rows = []
+        self.new_japan_rows = []
+
+        # VAR on the differenced data: regress d(t) on [d(t-1), ..., d(t-p)]
+        diffs = self.df.diff().dropna().values
+        lags = np.column_stack([diffs[lag_order - i - 1:len(diffs) - i - 1] for i in range(lag_order)])
+        self.var_stats = LeastSquaresStats(lags, diffs[lag_order:])
+
+        self._refit_china()
+
+        # Japan's HRC prices regressed on China's
+        self.jp_stats = LeastSquaresStats(self.hrc_price_CN_JP[["China HRC (FOB, $/t)"]].values, self.hrc_price_CN_JP["Japan HRC (FOB, $/t)"].values)
+
+    # China's regression is fitted on log_trans(X), whose shifts depend on each column's minimum. Rebuild its
+    # statistics from the full history (only needed when a new month moves the minimum of a shifted column).
+    def _refit_china(self):
+        df = self.history()
+        X = df[list_of_variables]
+        self.x_min = X.min().values
+        self.log_shift = np.where(self.x_min < 0, np.abs(self.x_min) + 1, 0.0)
+        self.cn_stats = LeastSquaresStats(np.log(X.values + self.log_shift), df['HRC (FOB, $/t)'].values)
+
+    # Fold in a new month of wo_na.csv. row is indexed by column name and carries the month in row.name.
+    # Returns True if the update was incremental and False if China's regression had to be rebuilt.
+    def add_month(self, row):
+        values = np.asarray(row[final_cols], dtype=float)
+        self.new_rows.append((pd.Timestamp(row.name), values))
+
+        # VAR: one new differenced observation regressed on the previous lag_order differences
+        last_diffs = np.diff(self.tail, axis=0)
+        self.tail = np.vstack([self.tail[1:], values])
+        self.var_stats.add(last_diffs[::-1].reshape(-1), self.tail[-1] - self.tail[-2])
+
+        # China's regression: incremental unless the new month changes a log_trans shift
+        x = values[1:]
+        incremental = not np.any((x < self.x_min) & ((x < 0) | (self.x_min < 0)))
+        if incremental:
+            self.x_min = np.minimum(self.x_min, x)
+            self.cn_stats.add(np.log(x + self.log_shift), values[0])
+        else:
+            self._refit_china()
+        return incremental
+
+    # Fold in a new month of China's and Japan's actual HRC prices
+    def add_japan_month(self, date, china, japan):
+        self.new_japan_rows.append((pd.Timestamp(date), [china, japan]))
+        self.jp_stats.add([china], japan)
+
+    # Historical data including the months added so far
+    def history(self):
+        if self.new_rows:
+            dates, values = zip(*self.new_rows)
+            self.df = pd.concat([self.df, pd.DataFrame(np.array(values), index=pd.DatetimeIndex(dates, name=self.df.index.name), columns=final_cols)])
+            self.new_rows = []
+        return self.df
+
+    def japan_history(self):
+        if self.new_japan_rows:
+            dates, values = zip(*self.new_japan_rows)
+            cols = ["China HRC (FOB, $/t)", "Japan HRC (FOB, $/t)"]
+            self.hrc_price_CN_JP = pd.concat([self.hrc_price_CN_JP, pd.DataFrame(np.array(values), index=pd.DatetimeIndex(dates, name=self.hrc_price_CN_JP.index.name), columns=cols)])
+            self.new_japan_rows = []
+        return self.hrc_price_CN_JP
+
+    # Coefficients in the same layout as china_japan.fit_params
+    def params(self):
+        k = len(final_cols)
+        B = self.var_stats.solve()
+        cn = self.cn_stats.solve()[:, 0]
+        jp = self.jp_stats.solve()[:, 0]
+        japan_history = self.japan_history()
+        return {
+            'var_coefs': np.stack([B[1 + i * k:1 + (i + 1) * k].T for i in range(self.lag_order)]),
+            'var_intercept': B[0],
+            'sigma_u': self.var_stats.residual_cov(B),
+            'last_diff': np.diff(self.tail, axis=0),
+            'cn_coef': cn[1:],
+            'cn_intercept': np.float64(cn[0]),
+            'log_shift': self.log_shift.copy(),
+            'origin_names': np.array(['Japan']),
+            'origin_coefs': jp[:, None],
+            'origin_last_date': japan_history.index.values[-1:].astype('datetime64[ns]'),
+            'origin_last_price': japan_history["Japan HRC (FOB, $/t)"].values[-1:].astype(float),
+        }
+
+    def to_forecast_model(self, fingerprint=None):
+        return ForecastModel(self.history().copy(), self.japan_history().copy(), self.params(), fingerprint)
+
+
+# --- Check incremental updates against a full refit ---
+if __name__ == "__main__":
+    import time
+    from china_japan import load_data, fit_params
+
+    df, hrc_price_CN_JP = load_data()
+    lag_order = selected_lag_order(df)
+    inc = IncrementalModel(df.iloc[:-1], hrc_price_CN_JP.iloc[:-1], lag_order=lag_order)
+
+    start = time.perf_counter()
+    inc.add_month(df.iloc[-1])
+    inc.add_japan_month(hrc_price_CN_JP.index[-1], *hrc_price_CN_JP.iloc[-1].values)
+    params = inc.params()
+    elapsed = time.perf_counter() - start
+
+    reference = fit_params(df, hrc_price_CN_JP, lag_order=lag_order)
+    for name, value in reference.items():
+        if np.asarray(value).dtype.kind != 'f':
+            continue
+        print(f"{name}: max abs difference {np.max(np.abs(np.asarray(value) - params[name])):.2e}")
+    print(f"Incremental update took {elapsed * 1e6:.0f} microseconds")
@@ -0,0 +1,103 @@
+# --- Import libraries ---
+import numpy as np
+
+# --- Pure-NumPy inference core for the VAR and regression stages ---
+# Fitting stays on statsmodels/sklearn (see china_japan.fit_forecast_model); scoring a forecast only needs the fitted
+# coefficient arrays, so the serving path imports neither library.
+
+# Companion matrix of a VAR(p), moving the stacked state [y(t), y(t-1), ..., y(t-p+1)] one step forward
+def companion_matrix(var_coefs):
+    k_ar, k, _ = var_coefs.shape
+    companion = np.zeros((k_ar * k, k_ar * k), dtype=var_coefs.dtype)
+    companion[:k] = np.concatenate(list(var_coefs), axis=1)
+    companion[k:, :-k] = np.eye((k_ar - 1) * k, dtype=var_coefs.dtype)
+    return companion
+
+# Forecast the differenced series `steps` periods ahead from the last k_ar observations (oldest first).
+# last_diff may carry leading batch dimensions (..., k_ar, k); shocks (..., steps, k) are added to each step's innovation.
+def var_forecast(var_coefs, var_intercept, last_diff, steps, shocks=None):
+    var_coefs = np.asarray(var_coefs, dtype=np.result_type(last_diff, np.float32))
+    k_ar, k, _ = var_coefs.shape
+    companion_T = companion_matrix(var_coefs).T
+
+    # State vector holds the most recent observation first
+    state = np.asarray(last_diff, dtype=var_coefs.dtype)[..., ::-1, :]
+    state = state.reshape(state.shape[:-2] + (k_ar * k,))
+    intercept = np.asarray(var_intercept, dtype=var_coefs.dtype)
+
+    out = np.empty(state.shape[:-1] + (steps, k), dtype=var_coefs.dtype)
+    for h in range(steps):
+        state = state @ companion_T
+        state[..., :k] += intercept
+        if shocks is not None:
+            state[..., :k] += shocks[..., h, :]
+        out[..., h, :] = state[..., :k]
+    return out
+
+# Invert differencing: add the cumulative forecasted changes to the last observed levels
+def integrate(last_level, diff_forecast):
+    return last_level + np.cumsum(diff_forecast, axis=-2)
+
+# Array version of china_japan.log_trans: every column whose minimum over the time axis is negative is shifted by
+# |min| + 1 before taking logs. Works on (..., periods, columns) arrays, transforming each leading-axis frame separately.
+def log_trans_array(X):
+    col_min = X.min(axis=-2, keepdims=True)
+    shift = np.where(col_min < 0, abs(col_min) + 1, 0).astype(X.dtype)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.log(X + shift)
+
+# Shifts log_trans applies to the columns of a fitted table X (periods x columns)
+def log_shifts(X):
+    col_min = np.asarray(X, dtype=float).min(axis=0)
+    return np.where(col_min < 0, np.abs(col_min) + 1, 0.0)
+
+# log(X + shift) with fixed shifts (e.g. the training data's log_shifts), for values that were not part of the data the
+# shifts came from. Shifted training columns are at least 1 and the unshifted ones (prices, shares) well above it, so a
+# value below 1 after shifting lies outside the range the regression was fitted on and is floored at log(1) = 0.
+LOG_FLOOR = 1.0
+
+def log_shifted(X, shift):
+    shifted = X + np.asarray(shift, dtype=X.dtype)
+    return np.log(np.maximum(shifted, X.dtype.type(LOG_FLOOR)))
+
+# Which values of X log_shifted floors
+def outside_log_range(X, shift):
+    return X + np.asarray(shift, dtype=X.dtype) < LOG_FLOOR
+
+# Apply linear regression coefficients directly
+def predict_linear(X, coef, intercept):
+    return X @ np.asarray(coef, dtype=X.dtype) + X.dtype.type(intercept)
+
+
+# --- Check the NumPy path against statsmodels/sklearn ---
+if __name__ == "__main__":
+    import pandas as pd
+    from china_japan import load_data, fit_forecast_model, invert_transformation, log_trans, final_cols, list_of_variables, selected_lag_order
+    from statsmodels.tsa.api import VAR
+    from sklearn.linear_model import LinearRegression
+
+    df, hrc_price_CN_JP = load_data()
+    model = fit_forecast_model(df, hrc_price_CN_JP)
+
+    # Reference chain as in the original generate_forecast
+    final_df = df[final_cols]
+    final_df_differenced = final_df.diff().dropna()
+    model_fitted = VAR(final_df_differenced).fit(selected_lag_order(final_df))
+    fc = model_fitted.forecast(y=final_df_differenced.values[-model_fitted.k_ar:], steps=17)
+    df_forecast = pd.DataFrame(fc, columns=final_df.columns + '_1d')
+    df_forecast_processed = invert_transformation(final_df, df_forecast)
+    forecasted_X = df_forecast_processed[[col + '_forecast' for col in list_of_variables]]
+    forecasted_X.columns = list_of_variables
+    lr_model = LinearRegression().fit(log_trans(df[list_of_variables]), df['HRC (FOB, $/t)'])
+    y_forecast = lr_model.predict(log_trans(forecasted_X))
+    model_JP = LinearRegression().fit(hrc_price_CN_JP[["China HRC (FOB, $/t)"]], hrc_price_CN_JP["Japan HRC (FOB, $/t)"])
+    y_JP_forecast = model_JP.predict(pd.DataFrame({"China HRC (FOB, $/t)": y_forecast[model.jp_mask[1:]]}))
+
+    diffs = {
+        'VAR forecast': np.abs(df_forecast_processed[[col + '_forecast' for col in final_cols]].values - model.df_forecast_processed.values).max(),
+        'China forecast': np.abs(y_forecast - model.final_forecast.values[1:, 0]).max(),
+        'Japan forecast': np.abs(y_JP_forecast - model.df_forecast_JP.values[1:, 0]).max(),
+    }
+    for name, diff in diffs.items():
+        print(f"{name}: max abs difference {diff:.2e}")
+    assert max(diffs.values()) < 1e-9
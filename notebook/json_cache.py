@@ -0,0 +1,43 @@
+# --- Import libraries ---
+import json
+import os
+
+# --- Persistent JSON caches of analysis results ---
+# The result caches of stationarity.py, granger.py and tournament.py: a dict loaded from its json file on first use and
+# written back after new results are added. A save first merges whatever other processes wrote to the file since it
+# was loaded, then writes a temporary file named after the process id and moves it into place, so concurrent runs
+# never write to the same temporary file and the cache file is always complete.
+class JsonCache(dict):
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self.loaded = False
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def load(self):
+        if not self.loaded:
+            self.loaded = True
+            self.update(self._read())
+
+    def save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            for key, value in self._read().items():
+                self.setdefault(key, value)
+            tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "w") as f:
+                json.dump(self, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            pass
+
+# Whether n_tasks uncached tasks are worth a process pool. Below min_tasks, starting the worker processes costs more
+# than it saves, so the tasks run in this process; each module sets min_tasks from the cost of one of its tasks.
+def use_pool(n_tasks, workers, min_tasks):
+    return workers != 1 and n_tasks >= min_tasks
@@ -0,0 +1,69 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+import argparse
+import time
+
+# --- VAR lag order selection from one QR factorization ---
+# The same information criteria as statsmodels' VAR.select_order. Every order p = 0..max_lags is fitted on the same
+# sample (the first max_lags observations are held back as presample), and the regressors of order p are the first
+# 1 + k*p columns of the order-max_lags design [1, y(t-1), ..., y(t-max_lags)]. The R factor of [design | y] therefore
+# holds the residual cross-products of every order at once: for order p they are the cross-products of the rows of
+# R below 1 + k*p in the y columns. One factorization replaces max_lags + 1 VAR fits.
+CRITERIA = ['aic', 'bic', 'fpe', 'hqic']
+
+# Lagged design [1, y(t-1), ..., y(t-max_lags)] and targets y(t) for t = max_lags..n-1
+def lag_design(diffs, max_lags):
+    n = len(diffs)
+    lags = [diffs[max_lags - i:n - i] for i in range(1, max_lags + 1)]
+    return np.column_stack([np.ones(n - max_lags)] + lags), diffs[max_lags:]
+
+# Information criteria of every lag order from 0 to max_lags, one row per order
+def lag_order_criteria(diffs, max_lags):
+    diffs = np.asarray(diffs, dtype=float)
+    k = diffs.shape[1]
+    Z, Y = lag_design(diffs, max_lags)
+    nobs, m = Z.shape
+    R = np.linalg.qr(np.column_stack([Z, Y]), mode='r')
+
+    rows = []
+    for p in range(max_lags + 1):
+        n_params = 1 + k * p
+        resid = R[n_params:, m:]
+        sigma_mle = resid.T @ resid / nobs
+        ld = np.linalg.slogdet(sigma_mle)[1]
+        free_params = k * n_params
+        rows.append({
+            'aic': ld + 2 / nobs * free_params,
+            'bic': ld + np.log(nobs) / nobs * free_params,
+            'fpe': ((nobs + n_params) / (nobs - n_params)) ** k * np.exp(ld),
+            'hqic': ld + 2 * np.log(np.log(nobs)) / nobs * free_params,
+        })
+    return pd.DataFrame(rows, index=pd.RangeIndex(max_lags + 1, name='Lag'))
+
+# Lag order minimizing criterion among orders >= min_lag, or default when no criterion is given
+def choose_lag_order(criteria, criterion=None, default=None, min_lag=1):
+    if criterion is None:
+        return default
+    if criterion not in CRITERIA:
+        raise ValueError(f"criterion must be one of {CRITERIA}")
+    return int(criteria[criterion].loc[min_lag:].idxmin())
+
+
+if __name__ == "__main__":
+    from china_japan import load_data, final_cols, selected_lag_order, MAX_LAGS, LAG_CRITERION
+
+    parser = argparse.ArgumentParser(description="Information criteria of every VAR lag order of the forecast model")
+    parser.add_argument("--max-lags", type=int, default=MAX_LAGS, help="highest lag order to evaluate")
+    args = parser.parse_args()
+
+    df, _ = load_data()
+    start = time.perf_counter()
+    criteria = lag_order_criteria(df[final_cols].diff().dropna().values, args.max_lags)
+    elapsed = time.perf_counter() - start
+
+    print(criteria.to_string(float_format=lambda v: f"{v:.4g}"), end="\n\n")
+    print("Order minimizing each criterion (orders >= 1): " + ", ".join(f"{c.upper()} {choose_lag_order(criteria, c)}" for c in CRITERIA))
+    print(f"Lag order used by the forecast: {selected_lag_order(df)}"
+          + (f" (minimum {LAG_CRITERION.upper()})" if LAG_CRITERION else " (selection is off: fixed LAG_ORDER, set LAG_CRITERION in china_japan.py to select)"))
+    print(f"Evaluated {args.max_lags + 1} lag orders in {elapsed * 1e3:.1f}ms")
@@ -0,0 +1,138 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+
+# --- Landed price of imported HRC in India ---
+# Editable inputs of the landed price calculators, in the order of the dashboard fields
+INPUT_NAMES = ['sea_freight', 'basic_customs_duty', 'antidumping', 'mip', 'safeguard_duty', 'applicable_sgd',
+               'lc_port_charges', 'exchange_rate', 'freight_port_city']
+
+FINAL_ROW = "HRC Basic Landed @ Mumbai Market (Rs/t)"
+
+# Landed price calculator defaults of the dashboard, per origin
+DEFAULT_LANDED_INPUTS = {
+    'China': {'sea_freight': 30, 'basic_customs_duty': 7.5, 'antidumping': 0, 'mip': 0, 'safeguard_duty': 0,
+              'applicable_sgd': 0, 'lc_port_charges': 10, 'exchange_rate': 86, 'freight_port_city': 500},
+    'Japan': {'sea_freight': 30, 'basic_customs_duty': 0, 'antidumping': 0, 'mip': 0, 'safeguard_duty': 0,
+              'applicable_sgd': 0, 'lc_port_charges': 10, 'exchange_rate': 86, 'freight_port_city': 500},
+}
+
+# Compute the full CFR -> CIF -> BCD -> SWS -> SGD -> port -> city chain with array operations.
+# All inputs broadcast against each other, so one call can cover every month x origin x route at once.
+def landed_price_breakdown(fob, sea_freight, basic_customs_duty, antidumping, mip, safeguard_duty, applicable_sgd, lc_port_charges, exchange_rate, freight_port_city):
+    fob, sea_freight, basic_customs_duty, antidumping, mip, safeguard_duty, applicable_sgd, lc_port_charges, exchange_rate, freight_port_city = np.broadcast_arrays(
+        *[np.asarray(v, dtype=float) for v in (fob, sea_freight, basic_customs_duty, antidumping, mip, safeguard_duty, applicable_sgd, lc_port_charges, exchange_rate, freight_port_city)])
+
+    cfr = fob + sea_freight
+    insurance = cfr * 0.01
+    cif = insurance + cfr
+    bcd = cif * (basic_customs_duty / 100)
+    sws = bcd * 0.1
+    landed_value = cif + bcd + sws
+    safeguard_abs = landed_value * safeguard_duty
+    port_price = lc_port_charges + applicable_sgd + antidumping + landed_value + mip
+    port_price_rs = exchange_rate * port_price
+    market_price = port_price_rs + freight_port_city
+
+    # Rows of the breakdown shown on the dashboard
+    return {
+        "HRC FOB ($/t)": fob,
+        "Sea Freight ($/t)": sea_freight,
+        "HRC CFR at Mumbai Port (A) ($/t)": cfr,
+        "Insurance @1% on CFR ($/t)": insurance,
+        "CIF / Assessable Value ($/t)": cif,
+        "Basic Customs Duty (%)": basic_customs_duty,
+        "Basic Customs Duty (Absolute) ($/t)": bcd,
+        "Social Welfare Surcharge @10% on BCD ($/t)": sws,
+        "Landed Value ($/t)": landed_value,
+        "Antidumping from 8th Aug'16 to 7th Aug'21 ($/t)": antidumping,
+        "MIP (5th Feb 2016 to 4th Aug 2016) ($/t)": mip,
+        "Safeguard Duty (%)": safeguard_duty,
+        "Safeguard Duty (Absolute) ($/t)": safeguard_abs,
+        "Applicable SGD ($/t)": applicable_sgd,
+        "LC Charges & Port Charges ($/t)": lc_port_charges,
+        "Landed Price at Port ($/t)": port_price,
+        "Exchange Rate (INR/$)": exchange_rate,
+        "Landed Price @ Mumbai Port (Rs/t)": port_price_rs,
+        "Freight (from port to city) (Rs/t)": freight_port_city,
+        FINAL_ROW: market_price,
+    }
+
+# Breakdown table of a single landed price calculation, as displayed under each calculator
+def breakdown_table(fob, inputs, origin):
+    breakdown = landed_price_breakdown(fob, **inputs)
+    table = pd.DataFrame({"Price": [float(v) for v in breakdown.values()]}, index=list(breakdown.keys()))
+    table.rename(index={"HRC FOB ($/t)": f"HRC FOB {origin} ($/t)"}, inplace=True)
+    table.index.name = "Breakdown"
+    return table
+
+# Stack each input across origins, giving arrays of shape (origins,)
+def _stack_inputs(inputs_by_origin):
+    return {name: np.array([inputs[name] for inputs in inputs_by_origin.values()], dtype=float) for name in INPUT_NAMES}
+
+# Landed price at the market for every forecast month and origin, in one vectorized call.
+# forecast has one '<origin> HRC Forecast (FOB, $/t)' column per origin; inputs_by_origin maps origin -> calculator inputs.
+def landed_price_table(forecast, inputs_by_origin):
+    origins = list(inputs_by_origin)
+    fob = forecast[[f"{origin} HRC Forecast (FOB, $/t)" for origin in origins]].values
+    breakdown = landed_price_breakdown(fob, **_stack_inputs(inputs_by_origin))
+    return pd.DataFrame(breakdown[FINAL_ROW], index=forecast.index, columns=[f"{origin} Landed Price (Rs/t)" for origin in origins])
+
+# Landed price at the destination city for every forecast month x origin x route, in one vectorized call.
+# routes has one row per port/city route with 'Port', 'City', one 'Sea Freight <origin> ($/t)' column per origin and
+# 'Freight (from port to city) (Rs/t)'; route values replace the sea and inland freight of inputs_by_origin.
+def route_matrix(forecast, inputs_by_origin, routes):
+    origins = list(inputs_by_origin)
+    fob = forecast[[f"{origin} HRC Forecast (FOB, $/t)" for origin in origins]].values
+    inputs = {name: values[None, :, None] for name, values in _stack_inputs(inputs_by_origin).items()}
+    inputs['sea_freight'] = routes[[f"Sea Freight {origin} ($/t)" for origin in origins]].values.T[None, :, :].astype(float)
+    inputs['freight_port_city'] = routes["Freight (from port to city) (Rs/t)"].values[None, None, :].astype(float)
+
+    # Result has shape (months, origins, routes)
+    market_price = landed_price_breakdown(fob[:, :, None], **inputs)[FINAL_ROW]
+    index = pd.MultiIndex.from_product([forecast.index, origins], names=[forecast.index.name or 'Month', 'Origin'])
+    columns = [f"{port} -> {city}" for port, city in zip(routes['Port'], routes['City'])]
+    return pd.DataFrame(market_price.reshape(-1, len(routes)), index=index, columns=columns)
+
+# --- Break-even solver ---
+# Inputs that break_even_value can solve for, with their dashboard labels
+BREAK_EVEN_INPUTS = {
+    'fob': "HRC FOB ($/t)",
+    'sea_freight': "Sea Freight ($/t)",
+    'basic_customs_duty': "Basic Customs Duty (%)",
+    'exchange_rate': "Exchange Rate (INR/$)",
+    'freight_port_city': "Freight (from port to city) (Rs/t)",
+}
+
+# The market price is linear in each of these inputs when the others are held fixed:
+#   market = exchange_rate * (charges + 1.01 * (1 + 0.011 * basic_customs_duty) * (fob + sea_freight)) + freight_port_city
+# with charges = LC & port charges + applicable SGD + antidumping + MIP. Solving it for one input gives the value at which
+# the landed price at Mumbai market equals domestic_price. All arguments broadcast; the current value of the solved input is ignored.
+def break_even_value(solve_for, domestic_price, fob, sea_freight, basic_customs_duty, antidumping, mip, safeguard_duty, applicable_sgd, lc_port_charges, exchange_rate, freight_port_city):
+    domestic_price, fob, sea_freight, basic_customs_duty, antidumping, mip, applicable_sgd, lc_port_charges, exchange_rate, freight_port_city = np.broadcast_arrays(
+        *[np.asarray(v, dtype=float) for v in (domestic_price, fob, sea_freight, basic_customs_duty, antidumping, mip, applicable_sgd, lc_port_charges, exchange_rate, freight_port_city)])
+    charges = lc_port_charges + applicable_sgd + antidumping + mip
+    duty_factor = 1.01 * (1 + basic_customs_duty / 100 * 1.1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if solve_for == 'freight_port_city':
+            return domestic_price - exchange_rate * (charges + duty_factor * (fob + sea_freight))
+        if solve_for == 'exchange_rate':
+            return (domestic_price - freight_port_city) / (charges + duty_factor * (fob + sea_freight))
+
+        # Landed value in $/t needed at the port for the market price to equal domestic_price
+        landed_value = (domestic_price - freight_port_city) / exchange_rate - charges
+        if solve_for == 'fob':
+            return landed_value / duty_factor - sea_freight
+        if solve_for == 'sea_freight':
+            return landed_value / duty_factor - fob
+        if solve_for == 'basic_customs_duty':
+            return (landed_value / (1.01 * (fob + sea_freight)) - 1) / 1.1 * 100
+    raise ValueError(f"Cannot solve for '{solve_for}', choose one of {list(BREAK_EVEN_INPUTS)}")
+
+# Break-even value of one input for every forecast month and origin, in one vectorized call
+def break_even_table(forecast, inputs_by_origin, solve_for, domestic_price):
+    origins = list(inputs_by_origin)
+    fob = forecast[[f"{origin} HRC Forecast (FOB, $/t)" for origin in origins]].values
+    values = break_even_value(solve_for, domestic_price, fob, **_stack_inputs(inputs_by_origin))
+    return pd.DataFrame(values, index=forecast.index, columns=[f"{origin} Break-even {BREAK_EVEN_INPUTS[solve_for]}" for origin in origins])
@@ -0,0 +1,113 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import json
+import os
+import shutil
+import tempfile
+
+# --- On-disk artifact store for fitted forecast models ---
+# Each artifact is a folder named after the dataset fingerprint, holding one .npy file per array and a manifest.json.
+# Arrays are loaded with numpy memory-mapping, so every dashboard worker shares the same pages instead of holding a copy.
+ARTIFACT_FORMAT_VERSION = 4
+ARTIFACT_ROOT = Path(__file__).resolve().parent.parent / "data" / "models"
+MANIFEST_NAME = "manifest.json"
+
+CN_JP_COLS = ['China HRC (FOB, $/t)', 'Japan HRC (FOB, $/t)']
+
+# Write a set of named arrays as an artifact, replacing any existing artifact for the same fingerprint
+def save_artifact(fingerprint, arrays, meta=None, root=ARTIFACT_ROOT):
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    target = root / fingerprint
+
+    # Write into a temporary folder first so that workers never see a half-written artifact
+    tmp_dir = Path(tempfile.mkdtemp(dir=root, prefix=".tmp-"))
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "fingerprint": fingerprint,
+        "meta": meta or {},
+        "arrays": {},
+    }
+    for name, value in arrays.items():
+        value = np.ascontiguousarray(value)
+        np.save(tmp_dir / f"{name}.npy", value, allow_pickle=False)
+        manifest["arrays"][name] = {"dtype": value.dtype.str, "shape": list(value.shape)}
+    with open(tmp_dir / MANIFEST_NAME, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp_dir, target)
+    return target
+
+# Load the arrays of an artifact as read-only memory maps, or return None if there is no usable artifact
+def load_artifact(fingerprint, root=ARTIFACT_ROOT):
+    target = Path(root) / fingerprint
+    manifest_path = target / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION or manifest.get("fingerprint") != fingerprint:
+        return None
+
+    arrays = {}
+    for name, spec in manifest["arrays"].items():
+        arr = np.load(target / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+        if arr.dtype.str != spec["dtype"] or list(arr.shape) != spec["shape"]:
+            return None
+        arrays[name] = arr
+    return arrays, manifest["meta"]
+
+# --- Convert forecast models to and from artifacts ---
+def model_to_arrays(model):
+    arrays = dict(model.params)
+    arrays['history'] = model.df.values
+    arrays['history_dates'] = model.df.index.values
+    arrays['hrc_CN_JP'] = model.hrc_price_CN_JP[CN_JP_COLS].values
+    arrays['hrc_CN_JP_dates'] = model.hrc_price_CN_JP.index.values
+    return arrays
+
+def model_from_arrays(arrays, meta, fingerprint=None):
+    from china_japan import ForecastModel
+
+    df = pd.DataFrame(arrays['history'], index=pd.DatetimeIndex(arrays['history_dates'], name='Date'), columns=meta['history_columns'])
+    hrc_price_CN_JP = pd.DataFrame(arrays['hrc_CN_JP'], index=pd.DatetimeIndex(arrays['hrc_CN_JP_dates'], name='Date'), columns=CN_JP_COLS)
+    params = {name: arr for name, arr in arrays.items() if name not in ('history', 'history_dates', 'hrc_CN_JP', 'hrc_CN_JP_dates')}
+    return ForecastModel(df, hrc_price_CN_JP, params, fingerprint)
+
+# Lag order settings a model was fitted with; an artifact fitted with other settings is refitted
+def _lag_settings():
+    from china_japan import MAX_LAGS, LAG_CRITERION, LAG_ORDER
+    return {"max_lags": MAX_LAGS, "criterion": LAG_CRITERION, "default_order": LAG_ORDER}
+
+def save_model(model, root=ARTIFACT_ROOT):
+    meta = {"history_columns": list(model.df.columns), "lag_settings": _lag_settings(), "lag_order": model.k_ar}
+    return save_artifact(model.fingerprint, model_to_arrays(model), meta, root)
+
+def load_model(fingerprint, root=ARTIFACT_ROOT):
+    loaded = load_artifact(fingerprint, root)
+    if loaded is None:
+        return None
+    arrays, meta = loaded
+    from origins import ORIGINS
+    if meta.get("lag_settings") != _lag_settings() or list(arrays['origin_names']) != list(ORIGINS):
+        return None
+    return model_from_arrays(arrays, meta, fingerprint)
+
+# --- Build step: fit the models on the current datasets and write the artifact ---
+def main():
+    from china_japan import dataset_fingerprint, load_data, fit_forecast_model
+
+    fingerprint = dataset_fingerprint()
+    df, hrc_price_CN_JP = load_data()
+    model = fit_forecast_model(df, hrc_price_CN_JP, fingerprint)
+    target = save_model(model)
+    print(f"Saved model artifact with VAR lag order {model.k_ar} to {target}")
+
+
+if __name__ == "__main__":
+    main()
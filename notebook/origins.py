@@ -0,0 +1,53 @@
+# --- Import libraries ---
+import numpy as np
+from pathlib import Path
+from snapshot import read_csv_snapshot
+
+# --- Registry of origin markets priced off China's HRC ---
+# Each origin's FOB HRC price is modelled as a linear pass-through of China's FOB HRC price, fitted on a csv of both
+# monthly prices (like hrc_price_CN_JP.csv). The fitted models of all origins form one (2 x n_origins) coefficient
+# matrix, intercepts first, so every origin's forecast for every China path comes from a single stacked product
+# [1, china] @ coefs instead of one regression call per origin and path.
+DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "final"
+CHINA_COLUMN = 'China HRC (FOB, $/t)'
+
+# name -> csv with China's and the origin's prices, the origin's price column, and the number of trailing rows left
+# out of the fit (load_data has always dropped the last row of hrc_price_CN_JP.csv). Japan feeds the dashboard.
+ORIGINS = {
+    'Japan': {'path': DATA_DIR / 'hrc_price_CN_JP.csv', 'column': 'Japan HRC (FOB, $/t)', 'drop_last': 1},
+}
+
+# Add an origin, e.g. register_origin('Korea', DATA_DIR / 'hrc_price_CN_KR.csv', 'Korea HRC (FOB, $/t)')
+def register_origin(name, path, column, drop_last=0):
+    ORIGINS[name] = {'path': Path(path), 'column': column, 'drop_last': drop_last}
+
+# Price history files of the registered origins, each listed once
+def origin_paths():
+    return list(dict.fromkeys(spec['path'] for spec in ORIGINS.values()))
+
+# China's and the origin's monthly prices, leaving out months without both
+def load_origin_history(name):
+    spec = ORIGINS[name]
+    history = read_csv_snapshot(spec['path'])[[CHINA_COLUMN, spec['column']]].dropna()
+    return history.iloc[:len(history) - spec['drop_last']]
+
+# Least-squares pass-through of every origin in histories (name -> history as returned by load_origin_history).
+# Returns the arrays kept in the model params: origin_names, origin_coefs (2 x n_origins, intercept row first) and
+# each origin's last actual month and price (origin_last_date, origin_last_price), where its forecast starts.
+def fit_pass_through(histories):
+    names = list(histories)
+    coefs = np.empty((2, len(names)))
+    last_dates = np.empty(len(names), dtype='datetime64[ns]')
+    last_prices = np.empty(len(names))
+    for i, name in enumerate(names):
+        history = histories[name]
+        china = history[CHINA_COLUMN].values.astype(float)
+        price = history[ORIGINS[name]['column']].values.astype(float)
+        coefs[:, i] = np.linalg.lstsq(np.column_stack([np.ones(len(china)), china]), price, rcond=None)[0]
+        last_dates[i] = history.index[-1]
+        last_prices[i] = price[-1]
+    return {'origin_names': np.array(names), 'origin_coefs': coefs, 'origin_last_date': last_dates, 'origin_last_price': last_prices}
+
+# Prices of every origin for China prices of any shape: (...) -> (..., n_origins)
+def predict_origins(china, coefs):
+    return np.asarray(china, dtype=float)[..., None] * coefs[1] + coefs[0]
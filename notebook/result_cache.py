@@ -0,0 +1,104 @@
+# --- Import libraries ---
+from collections import OrderedDict
+from pathlib import Path
+import os
+import sys
+import threading
+import numpy as np
+
+# --- Process-wide LRU cache of scenario results ---
+# Shared by every session of a dashboard process, so a scenario computed for one user is served to the next without
+# recomputation. Entries are evicted least recently used first once their estimated size passes max_bytes, and the
+# whole cache is dropped as soon as any file under data/final is added, removed or modified (checked with one stat
+# per file on every lookup). Cached values are shared between sessions and must be treated as read-only.
+DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "final"
+DEFAULT_MAX_BYTES = 64 * 2**20
+
+# Version of the files under root: changes whenever a file is added, removed, resized or touched
+def data_version(root=DATA_DIR):
+    entries = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            stat = os.stat(path)
+            entries.append((path, stat.st_mtime_ns, stat.st_size))
+    return hash(tuple(sorted(entries)))
+
+# Bytes held by a value built from dicts, lists, tuples and numpy arrays, counting every object once. Object arrays
+# (e.g. plotly's date strings) count their elements as well as their pointers.
+def deep_size(value, seen=None):
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(deep_size(v, seen) for v in value)
+    elif isinstance(value, np.ndarray) and value.dtype == object:
+        size += sum(deep_size(v, seen) for v in value.flat)
+    return size
+
+class ResultCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, root=DATA_DIR):
+        self.max_bytes = max_bytes
+        self.root = root
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
+
+    # Cached value of key, or compute() stored under key. size_of(value) estimates the bytes a value holds.
+    def get_or_compute(self, key, compute, size_of):
+        version = data_version(self.root)
+        with self._lock:
+            if version != self._version:
+                if self._version is not None:
+                    self.invalidations += 1
+                self._entries.clear()
+                self._bytes = 0
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+        size = size_of(value)
+        with self._lock:
+            # Skip values too large for the cache and values computed while the data changed
+            if size <= self.max_bytes and version == self._version and key not in self._entries:
+                self._entries[key] = (value, size)
+                self._bytes += size
+                self._evict()
+        return value
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'max_bytes': self.max_bytes, 'hits': self.hits,
+                    'misses': self.misses, 'hit_rate': self.hits / lookups if lookups else 0.0,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
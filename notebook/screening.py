@@ -0,0 +1,111 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import argparse
+import time
+
+# --- Correlation and VIF screening of candidate drivers ---
+# The feature selection of 03_regression_modelling.ipynb as a module. All VIFs come at once from the diagonal of the
+# inverse correlation matrix instead of one regression per column, and when the worst column is dropped the inverse
+# of the remaining columns is downdated in O(k^2) instead of being recomputed.
+DATA_DIR = Path(__file__).resolve().parent.parent / "data" / "final"
+TARGET = 'HRC (FOB, $/t)'
+
+# Columns computed from the target itself, never used as drivers
+TARGET_DERIVED = ['HRC - RM Spread ($/t)']
+
+CORRELATION_THRESHOLD = 0.7
+VIF_THRESHOLD = 10
+MIN_TARGET_CORRELATION = 0.2
+
+# Matrix whose inverse has the VIFs on its diagonal. centered=True is the correlation matrix (VIF of a regression with
+# a constant); centered=False is the normalized X'X, which matches variance_inflation_factor on X without a constant
+# as called in the notebook.
+def _scaled_gram(X, centered=True):
+    X = np.asarray(X, dtype=float)
+    if centered:
+        X = X - X.mean(axis=0)
+    gram = X.T @ X
+    d = 1 / np.sqrt(np.diag(gram))
+    return gram * d[:, None] * d[None, :]
+
+# VIF of every column of a DataFrame
+def vif(X, centered=True):
+    P = np.linalg.inv(_scaled_gram(X, centered))
+    return pd.Series(np.diag(P), index=X.columns, name='VIF')
+
+# Pairs of columns with |r| >= threshold, each pair listed once
+def high_correlation_pairs(X, threshold=CORRELATION_THRESHOLD):
+    corr = X.corr().values
+    i, j = np.triu_indices_from(corr, k=1)
+    mask = np.abs(corr[i, j]) >= threshold
+    pairs = pd.DataFrame({'Feature 1': X.columns[i[mask]], 'Feature 2': X.columns[j[mask]], 'Correlation': corr[i, j][mask]})
+    return pairs.sort_values('Correlation', ascending=False, ignore_index=True)
+
+# Drop the column with the highest VIF until every VIF is below threshold. Columns in keep are never dropped.
+# Returns the kept columns (in their original order) and the dropped ones with their VIF at the time of dropping.
+def vif_elimination(X, threshold=VIF_THRESHOLD, keep=(), centered=True):
+    columns = list(X.columns)
+    P = np.linalg.inv(_scaled_gram(X, centered))
+    droppable = np.array([c not in keep for c in columns])
+    dropped = []
+
+    while len(columns) > 1:
+        vifs = np.where(droppable, np.diag(P), -np.inf)
+        j = int(np.argmax(vifs))
+        if vifs[j] < threshold:
+            break
+        dropped.append((columns.pop(j), vifs[j]))
+
+        # Inverse without column j: P[-j,-j] - P[-j,j] P[j,-j] / P[j,j]
+        rest = np.arange(len(P)) != j
+        P = P[np.ix_(rest, rest)] - np.outer(P[rest, j], P[j, rest]) / P[j, j]
+        droppable = droppable[rest]
+
+    return columns, pd.Series(dict(dropped), name='VIF at removal', dtype=float)
+
+# Shortlist of drivers for the target: numeric candidates that are not derived from the target, with
+# |correlation with the target| >= min_target_corr, after VIF elimination
+def shortlist(df, target=TARGET, exclude=TARGET_DERIVED, min_target_corr=MIN_TARGET_CORRELATION,
+              vif_threshold=VIF_THRESHOLD, keep=(), centered=True):
+    numeric = df.select_dtypes('number')
+    candidates = numeric.drop(columns=[target, *[c for c in exclude if c in numeric.columns]])
+    target_corr = candidates.corrwith(numeric[target])
+    candidates = candidates.loc[:, (target_corr.abs() >= min_target_corr) | candidates.columns.isin(keep)]
+    selected, _ = vif_elimination(candidates, vif_threshold, keep, centered)
+    return selected
+
+
+if __name__ == "__main__":
+    from snapshot import read_csv_snapshot
+
+    parser = argparse.ArgumentParser(description="Correlation and VIF screening of the candidate drivers of China's HRC price")
+    parser.add_argument("csv", nargs="?", default=str(DATA_DIR / "wo_na.csv"))
+    parser.add_argument("--vif-threshold", type=float, default=VIF_THRESHOLD, help="drop columns until every VIF is below this")
+    parser.add_argument("--corr-threshold", type=float, default=CORRELATION_THRESHOLD, help="report pairs of drivers with |r| at least this")
+    parser.add_argument("--min-target-corr", type=float, default=MIN_TARGET_CORRELATION, help="minimum |correlation| with the target")
+    parser.add_argument("--keep", nargs="*", default=[], help="columns that are never dropped")
+    parser.add_argument("--uncentered", action="store_true", help="VIF without a constant, as in the notebook")
+    args = parser.parse_args()
+
+    df = read_csv_snapshot(args.csv)
+    start = time.perf_counter()
+    X = df.select_dtypes('number').drop(columns=[TARGET])
+    vifs = vif(X, not args.uncentered)
+    pairs = high_correlation_pairs(X, args.corr_threshold)
+    selected = shortlist(df, min_target_corr=args.min_target_corr, vif_threshold=args.vif_threshold, keep=args.keep, centered=not args.uncentered)
+    elapsed = time.perf_counter() - start
+
+    print(vifs.sort_values(ascending=False).to_string(), end="\n\n")
+    print(f"Highly correlated pairs (|r| >= {args.corr_threshold}):")
+    print(pairs.to_string() if len(pairs) else "none", end="\n\n")
+    print("Shortlist:")
+    print("\n".join(selected))
+    print(f"\nScreened {X.shape[1]} candidates in {elapsed * 1e3:.1f}ms")
+
+    from china_japan import list_of_variables
+    if selected == list_of_variables:
+        print("Matches list_of_variables in china_japan.py")
+    else:
+        print("Differs from list_of_variables in china_japan.py")
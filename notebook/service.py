@@ -0,0 +1,204 @@
+# --- Import libraries ---
+import pandas as pd
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import argparse
+import json
+import math
+import threading
+import time
+from china_japan import get_fitted_model, forecast_scenarios, forecast_table, SCENARIO_INPUTS, DEFAULT_UPSIDE, DEFAULT_DOWNSIDE
+from landed_price import landed_price_table, breakdown_table, DEFAULT_LANDED_INPUTS
+
+# --- Headless JSON forecast service ---
+# Serves the dashboard's forecast and landed prices over HTTP for other tools. The fitted models stay warm in memory
+# (get_fitted_model only refits when the datasets change) and identical requests that arrive while one is being
+# computed wait for that computation instead of repeating it.
+#
+#   GET  /health    -> {"status": "ok", "fingerprint": ...}
+#   POST /forecast  -> forecast, upside/downside ranges and landed prices of one scenario
+#   GET  /forecast  -> the same for the default scenario
+#
+# A /forecast body may hold "upside" and "downside" driver values, "countries", landed price "inputs" per origin and a
+# "month" (e.g. "Apr-25") for the full landed price breakdown. Anything left out takes the dashboard's default.
+DEFAULT_PORT = 8765
+
+# Run identical concurrent computations once: the first caller for a key computes, later callers with the same key
+# wait for its result. Nothing is kept once the computation finishes.
+class Coalescer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def run(self, key, fn):
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if leader:
+            try:
+                future.set_result(fn())
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._in_flight[key]
+        return future.result()
+
+# Only one thread fits the models when the datasets change
+_model_lock = threading.Lock()
+
+def warm_model():
+    with _model_lock:
+        return get_fitted_model()
+
+def _merge(defaults, values, what):
+    values = values or {}
+    if not isinstance(values, dict):
+        raise ValueError(f"{what}s must be an object of name -> number")
+    unknown = set(values) - set(defaults)
+    if unknown:
+        raise ValueError(f"Unknown {what}: {sorted(unknown)}")
+    merged = {**defaults, **values}
+    for name, value in merged.items():
+        if not isinstance(value, (int, float)) or isinstance(value, bool) or not math.isfinite(value):
+            raise ValueError(f"{what} '{name}' must be a finite number")
+    return merged
+
+# Replace NaN and infinities (e.g. the range of a driver of 0, whose log is -inf) with None so the response is valid JSON
+def _to_list(values):
+    return [float(v) if math.isfinite(v) else None for v in values]
+
+# Validate a /forecast request body and fill in the defaults
+def parse_request(body):
+    unknown = set(body) - {'upside', 'downside', 'countries', 'inputs', 'month'}
+    if unknown:
+        raise ValueError(f"Unknown fields: {sorted(unknown)}")
+    countries = body.get('countries', list(DEFAULT_LANDED_INPUTS))
+    if not isinstance(countries, list) or not all(isinstance(c, str) for c in countries) or not set(countries) <= set(DEFAULT_LANDED_INPUTS):
+        raise ValueError(f"countries must be a subset of {list(DEFAULT_LANDED_INPUTS)}")
+    inputs = body.get('inputs') or {}
+    if not isinstance(inputs, dict) or not set(inputs) <= set(DEFAULT_LANDED_INPUTS):
+        raise ValueError(f"inputs must be given per origin, one of {list(DEFAULT_LANDED_INPUTS)}")
+    month = body.get('month')
+    if month is not None and not isinstance(month, str):
+        raise ValueError("month must be a string such as 'Apr-25'")
+    return {
+        'upside': _merge(DEFAULT_UPSIDE, body.get('upside'), 'upside driver'),
+        'downside': _merge(DEFAULT_DOWNSIDE, body.get('downside'), 'downside driver'),
+        'countries': [c for c in DEFAULT_LANDED_INPUTS if c in countries],
+        'inputs': {origin: _merge(defaults, inputs.get(origin), 'landed price input') for origin, defaults in DEFAULT_LANDED_INPUTS.items()},
+        'month': month,
+    }
+
+# Compute the response of a validated /forecast request
+def compute_forecast(request):
+    model = warm_model()
+    drivers = [[request['upside'][name] for name in SCENARIO_INPUTS], [request['downside'][name] for name in SCENARIO_INPUTS]]
+    china_up_down, japan_up_down = forecast_scenarios(model, drivers)
+    CN_JP_forecast = forecast_table(model)
+
+    countries = request['countries']
+    inputs_by_origin = {origin: request['inputs'][origin] for origin in countries}
+    landed = landed_price_table(CN_JP_forecast, inputs_by_origin) if countries else pd.DataFrame(index=CN_JP_forecast.index)
+
+    ranges = {'China': (model.forecast_period, china_up_down), 'Japan': (model.fc_period_JP, japan_up_down)}
+    response = {
+        'fingerprint': model.fingerprint,
+        'months': list(CN_JP_forecast.index),
+        'forecast': {f"{origin} HRC Forecast (FOB, $/t)": _to_list(CN_JP_forecast[f"{origin} HRC Forecast (FOB, $/t)"]) for origin in countries},
+        'ranges': {origin: {'dates': [d.strftime('%Y-%m-%d') for d in ranges[origin][0]],
+                            'upside': _to_list(ranges[origin][1][0]), 'downside': _to_list(ranges[origin][1][1])} for origin in countries},
+        'landed_price': {col: _to_list(landed[col]) for col in landed.columns},
+    }
+
+    # Full breakdown of one month, as shown under the dashboard's calculators
+    month = request['month']
+    if month is not None:
+        if month not in CN_JP_forecast.index:
+            raise ValueError(f"month must be one of {list(CN_JP_forecast.index)}")
+        response['breakdown'] = {origin: breakdown_table(CN_JP_forecast.loc[month, f"{origin} HRC Forecast (FOB, $/t)"], inputs_by_origin[origin], origin)["Price"].to_dict()
+                                 for origin in countries}
+    return response
+
+_coalescer = Coalescer()
+
+def handle_forecast(body):
+    request = parse_request(body)
+    return _coalescer.run(json.dumps(request, sort_keys=True), lambda: compute_forecast(request))
+
+class ForecastHandler(BaseHTTPRequestHandler):
+    def _send(self, status, payload):
+        data = json.dumps(payload, allow_nan=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    # Send the payload built by compute: 400 for an invalid request, 500 for any other failure
+    def _respond(self, compute):
+        try:
+            self._send(200, compute())
+        except ValueError as e:
+            self._send(400, {'error': str(e)})
+        except Exception as e:
+            self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._respond(lambda: {'status': 'ok', 'fingerprint': warm_model().fingerprint})
+        elif path == "/forecast":
+            self._respond(lambda: handle_forecast({}))
+        else:
+            self._send(404, {'error': f"Unknown path {path}"})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path != "/forecast":
+            self._send(404, {'error': f"Unknown path {path}"})
+            return
+        self._respond(self._forecast_from_body)
+
+    def _forecast_from_body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        return handle_forecast(body)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+class ForecastServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for bursts of clients connecting at once
+    request_queue_size = 128
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, quiet=False):
+    server = ForecastServer((host, port), ForecastHandler)
+    server.quiet = quiet
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON service for the China and Japan HRC forecast and landed prices")
+    parser.add_argument("--host", default="127.0.0.1", help="interface to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on")
+    parser.add_argument("--quiet", action="store_true", help="do not log each request")
+    args = parser.parse_args()
+
+    # Fit or load the models before accepting requests
+    start = time.perf_counter()
+    warm_model()
+    print(f"Models ready in {time.perf_counter() - start:.1f}s, serving on http://{args.host}:{args.port}")
+    server = make_server(args.host, args.port, args.quiet)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,149 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+# --- Binary columnar snapshots of the cleaned csv datasets ---
+# Each csv is parsed once and stored under data/snapshots as one column-major .npy block per column dtype, a datetime64
+# index and a schema.json header holding the column layout and a fingerprint of the source csv. Later reads memory-map
+# the blocks instead of parsing the csv, and the snapshot is rebuilt automatically whenever the csv changes.
+SNAPSHOT_FORMAT_VERSION = 2
+DATA_ROOT = Path(__file__).resolve().parent.parent / "data"
+SNAPSHOT_ROOT = DATA_ROOT / "snapshots"
+SCHEMA_NAME = "schema.json"
+
+# Cleaned tables read by the dashboard and the notebooks
+CLEANED_DATASETS = [DATA_ROOT / "final" / "wo_na.csv", DATA_ROOT / "final" / "hrc_price_CN_JP.csv",
+                    DATA_ROOT / "final" / "wo_na_all_cols.csv", DATA_ROOT / "processed" / "after_fillna.csv"]
+
+# Folder holding the snapshot of a csv, mirroring its location under data/
+def snapshot_dir(csv_path):
+    csv_path = Path(csv_path).resolve()
+    try:
+        relative = csv_path.relative_to(DATA_ROOT)
+    except ValueError:
+        relative = Path(hashlib.sha256(str(csv_path).encode()).hexdigest()[:16]) / csv_path.name
+    return SNAPSHOT_ROOT / relative.with_suffix("")
+
+def _file_stat(path):
+    stat = Path(path).stat()
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+def _file_hash(path):
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+# Write a schema through a temporary file and os.replace, so a concurrent reader never sees a partly written schema
+def _write_schema(schema_path, schema):
+    tmp_path = schema_path.with_name(f".{SCHEMA_NAME}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(schema, f, indent=2)
+    os.replace(tmp_path, schema_path)
+
+# Parse the csv and write its snapshot
+def build_snapshot(csv_path, index_col='Date'):
+    df = pd.read_csv(csv_path)
+    df.set_index(index_col, inplace=True)
+    df.index = pd.to_datetime(df.index)
+
+    target = snapshot_dir(csv_path)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(tempfile.mkdtemp(dir=target.parent, prefix=".tmp-"))
+
+    # Group columns by dtype so that each group is stored as one 2D block, column-major so every column is contiguous
+    blocks = []
+    for i, (dtype, cols) in enumerate(df.columns.groupby(df.dtypes.astype(str)).items()):
+        cols = list(cols)
+        values = df[cols].values
+        if values.dtype == object:
+            values = values.astype(str)
+        np.save(tmp_dir / f"block_{i}.npy", np.asfortranarray(values), allow_pickle=False)
+        blocks.append({"file": f"block_{i}.npy", "dtype": values.dtype.str, "columns": cols})
+    np.save(tmp_dir / "index.npy", df.index.values.astype("datetime64[ns]"), allow_pickle=False)
+
+    schema = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "source": str(Path(csv_path).resolve()),
+        "source_sha256": _file_hash(csv_path),
+        "source_stat": _file_stat(csv_path),
+        "index_name": index_col,
+        "columns": list(df.columns),
+        "nrows": len(df),
+        "blocks": blocks,
+    }
+    _write_schema(tmp_dir / SCHEMA_NAME, schema)
+
+    if target.exists():
+        shutil.rmtree(target)
+    os.replace(tmp_dir, target)
+    return schema
+
+# Return the schema of an up-to-date snapshot, rebuilding the snapshot if the csv has changed or the schema is unreadable
+def _current_schema(csv_path, index_col):
+    schema_path = snapshot_dir(csv_path) / SCHEMA_NAME
+    try:
+        with open(schema_path) as f:
+            schema = json.load(f)
+    except (FileNotFoundError, ValueError):
+        schema = None
+    if schema is not None and schema.get("format_version") == SNAPSHOT_FORMAT_VERSION and schema.get("index_name") == index_col:
+        # A matching size and mtime is trusted; otherwise the content hash decides
+        if schema["source_stat"] == _file_stat(csv_path):
+            return schema
+        if schema["source_sha256"] == _file_hash(csv_path):
+            schema["source_stat"] = _file_stat(csv_path)
+            _write_schema(schema_path, schema)
+            return schema
+    return build_snapshot(csv_path, index_col)
+
+# Table of a snapshot folder, with the blocks memory-mapped. A single-dtype table wraps its one block; a mixed table is
+# built from views of each block's columns in their original order, which pandas keeps as separate uncopied blocks
+# (pd.concat or reordering the columns of a 2D block would copy them).
+def _load_snapshot(target, schema):
+    index = pd.DatetimeIndex(np.load(target / "index.npy", mmap_mode="r"), name=schema["index_name"])
+
+    columns = {}
+    for block in schema["blocks"]:
+        values = np.load(target / block["file"], mmap_mode="r", allow_pickle=False)
+        if values.dtype.kind == "U":
+            values = values.astype(object)
+        if len(schema["blocks"]) == 1:
+            df = pd.DataFrame(values, index=index, columns=block["columns"], copy=False)
+            return df if list(df.columns) == schema["columns"] else df[schema["columns"]]
+        columns.update((name, values[:, j]) for j, name in enumerate(block["columns"]))
+    df = pd.DataFrame({i: columns[name] for i, name in enumerate(schema["columns"])}, index=index, copy=False)
+    df.columns = schema["columns"]
+    return df
+
+# Read a csv through its snapshot. Returns the same table as pd.read_csv followed by set_index(index_col) and
+# pd.to_datetime on the index; pass index_col=None to keep the dates as a regular 'Date' column instead.
+# Numeric columns are memory-mapped read-only and wrapped without copying; only text columns are copied.
+def read_csv_snapshot(csv_path, index_col='Date'):
+    try:
+        schema = _current_schema(csv_path, index_col or 'Date')
+        df = _load_snapshot(snapshot_dir(csv_path), schema)
+    except OSError:
+        # The snapshot folder is not writable, or another process replaced the snapshot while it was being read,
+        # so parse the csv directly
+        df = pd.read_csv(csv_path)
+        if index_col is not None:
+            df.set_index(index_col, inplace=True)
+            df.index = pd.to_datetime(df.index)
+        else:
+            df['Date'] = pd.to_datetime(df['Date'])
+        return df
+
+    if index_col is None:
+        df = df.reset_index()
+    return df
+
+
+# --- Build snapshots of every cleaned dataset ---
+if __name__ == "__main__":
+    for csv_path in CLEANED_DATASETS:
+        schema = build_snapshot(csv_path)
+        print(f"Snapshot of {csv_path.name}: {schema['nrows']} rows, {len(schema['columns'])} columns")
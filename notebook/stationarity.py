@@ -0,0 +1,138 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+from json_cache import JsonCache, use_pool
+
+# --- ADF and KPSS stationarity tests for every column and differencing order ---
+# The tests of 01_stationarity_tests.ipynb as a module. Every (test, series) pair is an independent task, so all
+# columns and differencing orders are tested at once across a process pool. Results are cached by a hash of the tested
+# values, in memory and in data/cache/stationarity.json, so only new or changed columns are ever tested again.
+CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cache" / "stationarity.json"
+MAX_ORDER = 2
+SIGNIFICANCE = 0.05
+
+# Fewest uncached tests run across a process pool (see json_cache.use_pool)
+MIN_PARALLEL_TASKS = 16
+
+# Settings of each test, as used in the notebook
+TESTS = {
+    'adf': {'autolag': 'AIC'},
+    'kpss': {'regression': 'ct'},
+}
+
+_cache = JsonCache(CACHE_PATH)
+
+def _cache_key(test, values):
+    h = hashlib.sha256(json.dumps([test, TESTS[test]]).encode())
+    h.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return h.hexdigest()
+
+# Run one test on one series. Returns the statistic, p-value and critical values.
+def _run_test(task):
+    from statsmodels.tsa.stattools import adfuller, kpss
+    warnings.filterwarnings("ignore")
+
+    test, values = task
+    if test == 'adf':
+        res = adfuller(values, **TESTS['adf'])
+        return {'stat': float(res[0]), 'p-value': float(res[1]), 'critical': {k: float(v) for k, v in res[4].items()}}
+    res = kpss(values, **TESTS['kpss'])
+    return {'stat': float(res[0]), 'p-value': float(res[1]), 'critical': {k: float(v) for k, v in res[3].items()}}
+
+# Run a list of (test, values) tasks, only computing the ones that are not cached
+def run_tests(tasks, workers=None):
+    _cache.load()
+    keys = [_cache_key(test, values) for test, values in tasks]
+    missing = {}
+    for key, task in zip(keys, tasks):
+        if key not in _cache:
+            missing.setdefault(key, task)
+
+    if missing:
+        workers = workers or os.cpu_count()
+        if not use_pool(len(missing), workers, MIN_PARALLEL_TASKS):
+            results = [_run_test(task) for task in missing.values()]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_run_test, missing.values(), chunksize=max(len(missing) // (4 * workers), 1)))
+        _cache.update(zip(missing, results))
+        _cache.save()
+    return [_cache[key] for key in keys]
+
+def _differenced(series, order):
+    return np.diff(series.dropna().values.astype(float), n=order)
+
+# ADF and KPSS results of every column at differencing orders 0 to max_order, one row per (column, order)
+def stationarity_table(df, max_order=MAX_ORDER, workers=None):
+    df = df.select_dtypes('number')
+    index = pd.MultiIndex.from_product([df.columns, range(max_order + 1)], names=['Column', 'Order'])
+    series = [_differenced(df[col], order) for col, order in index]
+    results = run_tests([(test, values) for values in series for test in TESTS], workers)
+    adf, kpss_ = results[0::2], results[1::2]
+
+    table = pd.DataFrame({
+        'ADF statistic': [r['stat'] for r in adf],
+        'ADF p-value': [r['p-value'] for r in adf],
+        'KPSS statistic': [r['stat'] for r in kpss_],
+        'KPSS p-value': [r['p-value'] for r in kpss_],
+    }, index=index)
+
+    # Stationary when ADF rejects a unit root and KPSS does not reject trend-stationarity
+    table['Stationary'] = (table['ADF p-value'] < SIGNIFICANCE) & (table['KPSS p-value'] >= SIGNIFICANCE)
+    return table
+
+# Smallest number of differences after which each column passes both tests (NaN if none up to max_order)
+def differencing_orders(df, max_order=MAX_ORDER, workers=None):
+    stationary = stationarity_table(df, max_order, workers)['Stationary'].unstack('Order')
+    orders = stationary.idxmax(axis=1).astype(float)
+    orders[~stationary.any(axis=1)] = np.nan
+    return orders.rename('Differencing order').reindex(df.select_dtypes('number').columns)
+
+# --- Tables of the notebook ---
+def _test_table(data_df, test, rows, workers=None):
+    results = run_tests([(test, data_df[c].dropna().values.astype(float)) for c in data_df.columns], workers)
+    table = pd.DataFrame({c: [r['stat'], r['p-value']] + [r['critical'][level] for level in rows] for c, r in zip(data_df.columns, results)},
+                         index=['Test statistic', 'p-value'] + [f'Critical value - {level}' for level in rows])
+    return table.round(4)
+
+def adf_test(data_df, workers=None):
+    return _test_table(data_df, 'adf', ['1%', '5%', '10%'], workers)
+
+def kpss_test(data_df, workers=None):
+    return _test_table(data_df, 'kpss', ['1%', '2.5%', '5%', '10%'], workers)
+
+def adf_results(df):
+    adf_df = adf_test(df)
+    stationary_cols = adf_df.columns[adf_df.loc['p-value'] < SIGNIFICANCE]
+    non_stationary_cols = adf_df.columns[adf_df.loc['p-value'] >= SIGNIFICANCE]
+    return stationary_cols, non_stationary_cols
+
+def kpss_results(df):
+    kpss_df = kpss_test(df)
+    stationary_cols = kpss_df.columns[kpss_df.loc['p-value'] >= SIGNIFICANCE]
+    non_stationary_cols = kpss_df.columns[kpss_df.loc['p-value'] < SIGNIFICANCE]
+    return stationary_cols, non_stationary_cols
+
+
+if __name__ == "__main__":
+    from snapshot import read_csv_snapshot
+
+    parser = argparse.ArgumentParser(description="Minimal differencing order of every column by ADF and KPSS tests")
+    parser.add_argument("csv", nargs="?", default=str(Path(__file__).resolve().parent.parent / "data" / "final" / "wo_na_all_cols.csv"))
+    parser.add_argument("--max-order", type=int, default=MAX_ORDER, help="highest differencing order to test")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    df = read_csv_snapshot(args.csv)
+    start = time.perf_counter()
+    orders = differencing_orders(df, args.max_order, args.workers)
+    print(orders.to_string())
+    print(f"Tested {orders.size} columns in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,62 @@
+# --- Import libraries ---
+from contextlib import nullcontext
+import threading
+import time
+
+# --- Lightweight per-stage timing spans ---
+# Code marks its stages with `with span("stage"):`. Spans are only recorded while a run is active on the current thread
+# (see start_run), so with timing switched off a span costs one attribute lookup and a shared no-op context manager.
+# Each Streamlit session reruns on its own thread, so concurrent sessions never mix their records.
+_local = threading.local()
+_NULL_SPAN = nullcontext()
+
+class _Span:
+    def __init__(self, run, stage):
+        self.run = run
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run['stages'].append({'stage': self.stage, 'seconds': time.perf_counter() - self.start})
+        return False
+
+def span(stage):
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return _NULL_SPAN
+    return _Span(run, stage)
+
+# Start recording spans on the current thread, or stop recording if enabled is False. Returns the record that
+# finish_run completes: {'label', 'started' (epoch seconds), 'stages': [{'stage', 'seconds'}, ...], 'total'}
+def start_run(label=None, enabled=True):
+    _local.run = {'label': label, 'started': time.time(), 'stages': [], '_start': time.perf_counter()} if enabled else None
+    return _local.run
+
+# Run being recorded on the current thread, or None
+def current_run():
+    return getattr(_local, 'run', None)
+
+def finish_run(run):
+    run['total'] = time.perf_counter() - run.pop('_start')
+    if getattr(_local, 'run', None) is run:
+        _local.run = None
+    return run
+
+# Table of the stage breakdown of a list of runs in milliseconds, one row per run.
+# Time not covered by any span is shown as 'other'.
+def stage_table(runs):
+    import pandas as pd
+
+    rows = []
+    for run in runs:
+        row = {}
+        for s in run['stages']:
+            row[s['stage']] = row.get(s['stage'], 0.0) + s['seconds'] * 1e3
+        row['other'] = max(run['total'] * 1e3 - sum(row.values()), 0.0)
+        row['total'] = run['total'] * 1e3
+        rows.append(row)
+    index = [time.strftime('%H:%M:%S', time.localtime(run['started'])) for run in runs]
+    return pd.DataFrame(rows, index=pd.Index(index, name='Rerun'))
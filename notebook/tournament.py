@@ -0,0 +1,197 @@
+# --- Import libraries ---
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import argparse
+import hashlib
+import json
+import os
+import time
+import warnings
+from china_japan import load_data, list_of_variables, forecast_steps, selected_lag_order
+from backtest import forecast_from_origin
+from inference import log_shifts, log_shifted
+from json_cache import JsonCache, use_pool
+
+# --- Model tournament with expanding-window time-series cross-validation ---
+# Candidate models of each stage of the forecast are scored on the same expanding-window folds: every fold trains on
+# all months before its test window and is scored on the following test_size months. The stages are
+#   china  China's HRC price regressed on the log-transformed drivers (04_multiple_regression.ipynb)
+#   japan  Japan's HRC price regressed on China's (05_hrc_price_Japan_prediction.ipynb)
+#   var    the whole chain (VAR on the differenced drivers -> China regression) forecasting China's HRC price over the
+#          test window from the end of the training window, for different VAR lag orders
+# Every (candidate, fold) fit is an independent task run across a process pool. Test predictions are cached by
+# candidate, fold and a hash of the stage's data in data/cache/tournament.json, so adding a candidate or a fold only
+# fits what is new.
+CACHE_PATH = Path(__file__).resolve().parent.parent / "data" / "cache" / "tournament.json"
+N_FOLDS = 5
+TEST_SIZE = forecast_steps
+
+# Part of every cache key: bump it when _fit_fold, make_estimator, the feature transform or
+# backtest.forecast_from_origin change what a fit predicts, so cached predictions of the old code are not reused
+TOURNAMENT_VERSION = 2
+
+# Fewest uncached fits run across a process pool (see json_cache.use_pool)
+MIN_PARALLEL_TASKS = 8
+
+CANDIDATES = {
+    'china': {
+        'linear': {'model': 'linear'},
+        'poly2': {'model': 'poly', 'degree': 2},
+        'ridge_1': {'model': 'ridge', 'alpha': 1.0},
+        'ridge_10': {'model': 'ridge', 'alpha': 10.0},
+        'lasso_1': {'model': 'lasso', 'alpha': 1.0},
+        'lasso_10': {'model': 'lasso', 'alpha': 10.0},
+    },
+    'japan': {
+        'linear': {'model': 'linear'},
+        'poly2': {'model': 'poly', 'degree': 2},
+    },
+    'var': {f'var_{p}': {'lag_order': p} for p in (1, 2, 3, 4, 6, 8)},
+}
+
+# Candidates used by china_japan.py on df; the VAR candidate follows the lag order the forecast selects
+def in_use(df):
+    return {'china': 'linear', 'japan': 'linear', 'var': f'var_{selected_lag_order(df)}'}
+
+_cache = JsonCache(CACHE_PATH)
+
+# Expanding-window folds over n observations: (train_end, test_end) pairs, the last test window ending at n
+def expanding_folds(n, n_folds=N_FOLDS, test_size=TEST_SIZE):
+    folds = [(n - (n_folds - i) * test_size, n - (n_folds - i - 1) * test_size) for i in range(n_folds)]
+    if folds[0][0] < 2:
+        raise ValueError(f"{n} observations are too few for {n_folds} folds of {test_size}")
+    return folds
+
+def make_estimator(spec):
+    from sklearn.linear_model import LinearRegression, Ridge, Lasso
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import PolynomialFeatures, StandardScaler
+
+    if spec['model'] == 'linear':
+        return LinearRegression()
+    if spec['model'] == 'poly':
+        return make_pipeline(PolynomialFeatures(spec['degree'], include_bias=False), LinearRegression())
+    if spec['model'] == 'ridge':
+        return make_pipeline(StandardScaler(), Ridge(alpha=spec['alpha']))
+    if spec['model'] == 'lasso':
+        return make_pipeline(StandardScaler(), Lasso(alpha=spec['alpha'], max_iter=100000))
+    raise ValueError(f"Unknown model {spec['model']}")
+
+# log_trans with the shifts of the training window, applied to the test window as well (see inference.log_shifted)
+def _log_features(X, train_end):
+    return log_shifted(X, log_shifts(X[:train_end]))
+
+# Data of the tournament, set once per worker process by _init_worker
+_data = {}
+
+def _init_worker(data):
+    _data.update(data)
+    warnings.filterwarnings("ignore")
+
+# Fit one candidate on one fold and return its test predictions
+def _fit_fold(task):
+    stage, spec, train_end, test_end = task
+    if stage == 'var':
+        china, _ = forecast_from_origin(_data['df'], _data['hrc_price_CN_JP'], train_end, test_end - train_end, spec['lag_order'])
+        return [float(v) for v in china]
+
+    X, y = _data[stage]
+    if stage == 'china':
+        X = _log_features(X, train_end)
+    estimator = make_estimator(spec).fit(X[:train_end], y[:train_end])
+    return [float(v) for v in estimator.predict(X[train_end:test_end])]
+
+def _stage_data(df, hrc_price_CN_JP):
+    return {
+        'df': df,
+        'hrc_price_CN_JP': hrc_price_CN_JP,
+        'china': (df[list_of_variables].values.astype(float), df['HRC (FOB, $/t)'].values.astype(float)),
+        'japan': (hrc_price_CN_JP[['China HRC (FOB, $/t)']].values.astype(float), hrc_price_CN_JP['Japan HRC (FOB, $/t)'].values.astype(float)),
+    }
+
+def _data_hash(data, stage):
+    h = hashlib.sha256(stage.encode())
+    if stage == 'china' or stage == 'var':
+        h.update(np.ascontiguousarray(data['df'].values, dtype=np.float64).tobytes())
+        h.update(data['df'].index.values.tobytes())
+    if stage == 'japan' or stage == 'var':
+        h.update(np.ascontiguousarray(data['hrc_price_CN_JP'].values, dtype=np.float64).tobytes())
+        h.update(data['hrc_price_CN_JP'].index.values.tobytes())
+    return h.hexdigest()
+
+def _run_tasks(tasks, data, workers):
+    if not use_pool(len(tasks), workers, MIN_PARALLEL_TASKS):
+        _init_worker(data)
+        return [_fit_fold(task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(data,)) as pool:
+        return list(pool.map(_fit_fold, tasks))
+
+def _metrics(predicted, actual):
+    errors = predicted - actual
+    return {'MAE': np.mean(np.abs(errors)), 'RMSE': np.sqrt(np.mean(errors ** 2)), 'MAPE': np.mean(np.abs(errors / actual)) * 100}
+
+# Score every candidate of the given stages on expanding-window folds. Returns a leaderboard with one row per
+# (stage, candidate), best RMSE first within each stage, and a flag for the candidate china_japan.py uses.
+def run_tournament(df=None, hrc_price_CN_JP=None, stages=tuple(CANDIDATES), candidates=CANDIDATES, n_folds=N_FOLDS, test_size=TEST_SIZE, workers=None):
+    if df is None:
+        df, hrc_price_CN_JP = load_data()
+    data = _stage_data(df, hrc_price_CN_JP)
+    _cache.load()
+
+    # The VAR candidate in use is always scored, even when its lag order is not among the candidates
+    used = in_use(df)
+    if 'var' in stages and used['var'] not in candidates['var']:
+        candidates = {**candidates, 'var': {**candidates['var'], used['var']: {'lag_order': selected_lag_order(df)}}}
+
+    # Folds and cache keys of every (stage, candidate, fold)
+    jobs = []
+    for stage in stages:
+        y = data['japan'][1] if stage == 'japan' else data['china'][1]
+        data_hash = _data_hash(data, stage)
+        for name, spec in candidates[stage].items():
+            for train_end, test_end in expanding_folds(len(y), n_folds, test_size):
+                key = hashlib.sha256(json.dumps([TOURNAMENT_VERSION, stage, spec, data_hash, train_end, test_end], sort_keys=True).encode()).hexdigest()
+                jobs.append({'stage': stage, 'name': name, 'spec': spec, 'fold': (train_end, test_end), 'key': key, 'actual': y[train_end:test_end]})
+
+    missing = {}
+    for job in jobs:
+        if job['key'] not in _cache:
+            missing.setdefault(job['key'], (job['stage'], job['spec'], *job['fold']))
+    if missing:
+        results = _run_tasks(list(missing.values()), data, workers or os.cpu_count())
+        _cache.update(zip(missing, results))
+        _cache.save()
+
+    rows = []
+    for stage in stages:
+        stage_rows = []
+        for name in candidates[stage]:
+            candidate_jobs = [job for job in jobs if job['stage'] == stage and job['name'] == name]
+            predicted = np.concatenate([_cache[job['key']] for job in candidate_jobs])
+            actual = np.concatenate([job['actual'] for job in candidate_jobs])
+            stage_rows.append({'Stage': stage, 'Candidate': name, **_metrics(predicted, actual), 'Folds': len(candidate_jobs), 'In use': used[stage] == name})
+        rows += sorted(stage_rows, key=lambda row: row['RMSE'])
+    return pd.DataFrame(rows).set_index(['Stage', 'Candidate'])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score candidate models of each forecast stage with expanding-window time-series cross-validation")
+    parser.add_argument("--stages", nargs="+", default=list(CANDIDATES), choices=list(CANDIDATES), help="stages to score")
+    parser.add_argument("--folds", type=int, default=N_FOLDS, help="number of expanding-window folds")
+    parser.add_argument("--test-size", type=int, default=TEST_SIZE, help="months in each test window")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes (default: all cores)")
+    parser.add_argument("--output", default=None, help="optional csv path for the leaderboard")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    leaderboard = run_tournament(stages=args.stages, n_folds=args.folds, test_size=args.test_size, workers=args.workers)
+    print(leaderboard.round(2).to_string())
+    used = in_use(load_data()[0])
+    for stage in args.stages:
+        best = leaderboard.loc[stage]['RMSE'].idxmin()
+        print(f"Best {stage} candidate: {best}" + ("" if best == used[stage] else f" (china_japan.py uses {used[stage]})"))
+    print(f"Tournament finished in {time.perf_counter() - start:.1f}s")
+    if args.output:
+        leaderboard.to_csv(args.output)